@@ -1,15 +1,22 @@
 import sys
 import mysql.connector
-import json
 import logging
 import requests
 import re
+from collections import Counter
 from datetime import datetime
+from functools import lru_cache
 import configparser
 import urllib3
 # ---------- Path setup ----------
 import os
 script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(script_dir)))
+from edustems_etl.change_detection import ensure_row_hash_column, row_fingerprint
+from edustems_etl.db import ConnectionManager
+from edustems_etl.http_client import client_from_config
+from edustems_etl.json_stream import iter_json_array
+
 log_file = os.path.join(script_dir, 'active_students_update.log')
 config_file = os.path.join(script_dir, 'config.ini')
 
@@ -48,52 +55,31 @@ db_config = {
     'database': config['mysql']['database']
 }
 
+# Grade/gender/division strings repeat across thousands of students, so the
+# normalizers below are memoized (bounded) and parse each distinct value once.
+NORMALIZER_CACHE_SIZE = 4096
+
 # ---------- API fetch ----------
-def get_api_session():
-    try:
-        session = requests.Session()
-        session.verify = False
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0',
-            'Accept': 'application/json'
-        })
-        return session
-    except Exception as e:
-        logger.error(f"Failed to create session: {str(e)}")
-        return None
+# Pooled session with split connect/read timeouts and retry on transient errors
+api_client = client_from_config(config, pool_size=1, headers={'User-Agent': 'Mozilla/5.0'})
 
 def fetch_data_from_api():
+    """
+    Returns the spooled getActiveStudents body, or None.
+    The body is decoded record by record by `iter_student_records`.
+    """
     try:
         logger.info("Fetching data from API...")
-        session = get_api_session()
-        if not session:
-            return None
-
         params = {
             'api-key': api_key,
             'school_name': 'ALL'
         }
-        # Use a single request with the correct parameters
-        response = session.get(api_url, params=params, timeout=600)  # Increased timeout to match assessment.py
-        logger.info(f"Response status code: {response.status_code}")
-        
-        if response.status_code == 200:
-            try:
-                data = response.json()
-                if data and isinstance(data, dict):
-                    logger.info(f"Data fetched successfully. Records found: {len(data.get('data', []))}")
-                    return data
-                else:
-                    logger.error("Invalid JSON response format")
-                    return None
-            except json.JSONDecodeError as je:
-                logger.error(f"Failed to parse JSON response: {str(je)}")
-                logger.error(f"Response content: {response.text[:500]}...")  # Log first 500 chars
-                return None
-        else:
-            logger.error(f"Failed to retrieve data. Status code: {response.status_code}")
-            logger.error(f"Response: {response.text}")
-            return None
+        payload = api_client.fetch(api_url, params)
+        logger.info(f"Response received: {api_client.records[-1].body_bytes} bytes")
+        return payload
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"Failed to retrieve data. Status code: {e.response.status_code}")
+        return None
     except requests.exceptions.RequestException as e:
         logger.error(f"Request error: {str(e)}")
         return None
@@ -101,10 +87,16 @@ def fetch_data_from_api():
         logger.error(f"Unexpected error: {str(e)}")
         return None
 
+def iter_student_records(payload):
+    """Yields the `data` rows one at a time from the spooled body."""
+    with payload:
+        yield from iter_json_array(payload)
+
 # ---------- Cleaning functions ----------
 def clean_student_name(value):
     return re.sub(r'\s+', " ", value).strip().title() if value else None
 
+@lru_cache(maxsize=NORMALIZER_CACHE_SIZE)
 def convert_grade_name(value):
     if not value:
         return None
@@ -130,12 +122,14 @@ def format_date_column(original_date):
         logger.warning(f"Invalid date format: {original_date}")
         return None
 
+@lru_cache(maxsize=NORMALIZER_CACHE_SIZE)
 def clean_gender(value):
     if not value:
         return None
     value = value.strip().upper()
     return "M" if value == "MALE" else "F" if value == "FEMALE" else value
 
+@lru_cache(maxsize=NORMALIZER_CACHE_SIZE)
 def extract_division(value):
     match = re.search(r'[A-Za-z]+', value)
     return match.group(0) if match else value
@@ -145,39 +139,22 @@ def generate_unique_key(record):
     return f"{record['school_name'].strip()}_{record['student_id']}_{record['academic_year']}_{record['grade_name']}"
 
 # ---------- MySQL connection ----------
+# The auth method that worked is remembered, so later runs connect on the first try
+db = ConnectionManager(db_config, pool_size=1, auth_methods=[
+    {'use_pure': True},  # Try pure Python implementation
+    {'auth_plugin': 'caching_sha2_password'},  # MySQL 8.0 default
+    {'auth_plugin': 'mysql_native_password'}  # MySQL 5.7 default
+])
+
 def connect_to_mysql():
     try:
         logger.info("Connecting to MySQL...")
-        # Try different authentication methods
-        auth_methods = [
-            {'use_pure': True},  # Try pure Python implementation
-            {'auth_plugin': 'caching_sha2_password'},  # MySQL 8.0 default
-            {'auth_plugin': 'mysql_native_password'}  # MySQL 5.7 default
-        ]
-        
-        conn = None
-        last_error = None
-        
-        for auth in auth_methods:
-            try:
-                connection_config = db_config.copy()
-                connection_config.update(auth)
-                conn = mysql.connector.connect(**connection_config)
-                if conn and conn.is_connected():
-                    logger.info("Connected to MySQL.")
-                    return conn
-            except mysql.connector.Error as e:
-                last_error = e
-                continue
-                
-        if not conn and last_error:
-            raise last_error
-            
+        conn = db.get()
+        logger.info("Connected to MySQL.")
+        return conn
     except Exception as err:
         logger.error(f"MySQL connection failed: {err}")
         return None
-    
-    return None
 
 def create_tables_if_not_exist(conn):
     try:
@@ -196,6 +173,7 @@ def create_tables_if_not_exist(conn):
                 division_name VARCHAR(10) NOT NULL,
                 academic_year VARCHAR(10) NOT NULL,
                 unique_key VARCHAR(255) NOT NULL,
+                row_hash CHAR(32),
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                 INDEX idx_school_grade (school_name, grade_name),
                 INDEX idx_student (student_id),
@@ -211,12 +189,27 @@ def create_tables_if_not_exist(conn):
         conn.rollback()
 
 # ---------- Insert or update ----------
-def insert_data_to_mysql(cursor, record):
+def current_academic_year(now):
+    return f"{now.year}-{now.year + 1}" if now.month >= 5 else f"{now.year - 1}-{now.year}"
+
+def fetch_existing_hashes(cursor, academic_year):
+    """Stored row hashes of the year's students, keyed by unique_key."""
+    cursor.execute(
+        "SELECT unique_key, row_hash FROM active_student_data WHERE academic_year = %s",
+        (academic_year,)
+    )
+    return dict(cursor.fetchall())
+
+def insert_data_to_mysql(cursor, record, existing_hashes=None):
+    """
+    Upserts one student row unless its content hash matches the stored one.
+    Returns 'inserted', 'changed', 'unchanged' or None on a MySQL error.
+    """
     sql = """
     INSERT INTO active_student_data (
         created_date, school_name, status, grade_name, student_name, student_id, gender,
-        division_name, academic_year, unique_key, timestamp
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        division_name, academic_year, unique_key, row_hash, timestamp
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
     ON DUPLICATE KEY UPDATE 
         created_date = VALUES(created_date),
         status = VALUES(status),
@@ -225,11 +218,12 @@ def insert_data_to_mysql(cursor, record):
         gender = VALUES(gender),
         division_name = VALUES(division_name),
         academic_year = VALUES(academic_year),
+        row_hash = VALUES(row_hash),
         timestamp = VALUES(timestamp)
     """
     try:
         now = datetime.now()
-        academic_year = f"{now.year}-{now.year + 1}" if now.month >= 5 else f"{now.year - 1}-{now.year}"
+        academic_year = current_academic_year(now)
         grade_clean = convert_grade_name(record.get('grade_name'))
 
         unique_key = generate_unique_key({
@@ -242,7 +236,7 @@ def insert_data_to_mysql(cursor, record):
         created_date_raw = record.get('created_date')
         created_date = format_date_column(created_date_raw) if created_date_raw else None
 
-        cursor.execute(sql, (
+        content = (
             created_date,
             record.get('school_name'),
             record.get('status'),
@@ -251,18 +245,24 @@ def insert_data_to_mysql(cursor, record):
             record.get('student_id'),
             clean_gender(record.get('gender')),
             extract_division(record.get('division_name')),
-            academic_year,
-            unique_key,
-            now.strftime('%Y-%m-%d %H:%M:%S')
-        ))
+            academic_year
+        )
+        row_hash = row_fingerprint(content)
+        if existing_hashes is not None and existing_hashes.get(unique_key) == row_hash:
+            return 'unchanged'
+
+        cursor.execute(sql, content + (unique_key, row_hash, now.strftime('%Y-%m-%d %H:%M:%S')))
 
         if cursor.rowcount == 1:
             logger.info(f"[INSERT] Student ID: {record.get('student_id')} | Key: {unique_key}")
+            return 'inserted'
         elif cursor.rowcount == 2:
             logger.info(f"[UPDATE] Student ID: {record.get('student_id')} | Key: {unique_key}")
+        return 'changed'
 
     except mysql.connector.Error as err:
         logger.error(f"MySQL insert/update error: {err}")
+        return None
 
 # ---------- Main ----------
 def main():
@@ -276,24 +276,46 @@ def main():
 
     # Create the tables if they don't exist
     create_tables_if_not_exist(conn)
+    ensure_row_hash_column(conn, 'active_student_data')
 
     # Then fetch and process the data
-    json_response = fetch_data_from_api()
-    if not json_response:
+    payload = fetch_data_from_api()
+    if payload is None:
         logger.error("No data fetched. Exiting.")
         sys.exit()
 
-    students_data = json_response.get('data', [])
-    if not students_data:
-        logger.error("API returned empty student data.")
-        sys.exit()
-
     cursor = conn.cursor()
     print("Inserting/updating records...")
-    logger.info(f"Processing {len(students_data)} records.")
 
-    for record in students_data:
-        insert_data_to_mysql(cursor, record)
+    # Unchanged students are skipped instead of being rewritten every run
+    existing_hashes = fetch_existing_hashes(cursor, current_academic_year(datetime.now()))
+    outcomes = Counter()
+
+    processed = 0
+    try:
+        for record in iter_student_records(payload):
+            outcomes[insert_data_to_mysql(cursor, record, existing_hashes)] += 1
+            processed += 1
+    except Exception as e:
+        # Nothing is committed until the whole payload has been read
+        logger.error(f"Failed to parse JSON response: {str(e)}")
+        conn.rollback()
+        cursor.close()
+        conn.close()
+        sys.exit()
+
+    if not processed:
+        logger.error("API returned empty student data.")
+        cursor.close()
+        conn.close()
+        sys.exit()
+
+    logger.info(f"Processed {processed} records.")
+    api_client.log_summary()
+    logger.info(f"Inserted: {outcomes['inserted']} | Changed: {outcomes['changed']} | Unchanged (skipped): {outcomes['unchanged']} | Failed: {outcomes[None]}")
+    for normalizer in (convert_grade_name, clean_gender, extract_division):
+        info = normalizer.cache_info()
+        logger.info(f"Normalizer cache {normalizer.__name__}: {info.hits} hits / {info.misses} misses")
 
     conn.commit()
     cursor.close()
@@ -0,0 +1,123 @@
+"""
+Property check and benchmark: generate_assessment_ids vs generate_assessment_id.
+
+Generates random partitions full of awkward values (blank/None/NaN cells,
+punctuation-only questions, non-ISO and invalid dates, float student ids,
+long multi-word competencies, absent columns) and asserts the columnar keys
+equal the scalar function applied to each `to_dict('records')` row, exactly
+as the loaders call it. Then times both on a realistic partition.
+
+    python benchmarks/bench_assessment_ids.py --cases 500 --rows 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from edustems_etl.assessment_ids import generate_assessment_id, generate_assessment_ids
+
+ID_COLUMNS = ['student_id', 'assessment_type', 'assessment_date', 'subject_name', 'competency_name', 'question_name']
+
+POOLS = {
+    'student_id': [
+        'S000123', ' 42 ', 'ab cd', '', None, 123456, 7.0, 'x' * 70
+    ],
+    'assessment_type': ['BOY', 'Unit 1A', 'unit 1 B', 'Weekly 5', ' Prelim 3', '', None],
+    'assessment_date': [
+        '2023-10-25', '2024-1-5', '25/10/2023', '2023-02-30', 'garbage', '', None, np.nan
+    ],
+    'subject_name': ['English', 'Ma', 'Science Lab', ' s ', '', None, 'ǆemal'],
+    'competency_name': [
+        'Number Sense', 'reading 2 comprehension', ' a b c ', '123', '', None,
+        'Very Long Competency Name With Many Words Indeed'
+    ],
+    'question_name': [
+        'Q1. Identify the main idea', '??', '', None, 'x', 'Ünïcödé wörds here',
+        'Reading_comprehension part two', 'a' * 80 + ' b'
+    ],
+}
+
+
+def random_partition(rng, rows):
+    columns = [c for c in ID_COLUMNS if rng.random() > 0.1]
+    data = {}
+    for col in columns:
+        pool = POOLS[col]
+        if col == 'student_id' and rng.random() < 0.3:
+            # numeric id column, optionally with gaps (float64 + NaN)
+            values = [float(rng.randint(1, 500)) if rng.random() > 0.2 else np.nan for _ in range(rows)]
+        else:
+            values = [rng.choice(pool) for _ in range(rows)]
+        data[col] = values
+    data['obtained_marks'] = [rng.random() for _ in range(rows)]
+    return pd.DataFrame(data)
+
+
+def scalar_ids(df):
+    records = df.where(pd.notnull(df), None).to_dict('records')
+    return [generate_assessment_id(r) for r in records]
+
+
+def property_check(cases, seed):
+    rng = random.Random(seed)
+    for case in range(cases):
+        df = random_partition(rng, rng.randint(1, 60))
+        if rng.random() < 0.3:
+            df.index = df.index * 3 + 5
+        expected = scalar_ids(df)
+        actual = generate_assessment_ids(df)
+        if actual.tolist() != expected or not actual.index.equals(df.index):
+            for i, (a, e) in enumerate(zip(actual.tolist(), expected)):
+                if a != e:
+                    print(f"❌ case {case} row {i}: columnar={a!r} scalar={e!r}")
+                    print(df.iloc[i].to_dict())
+                    break
+            return False
+    return True
+
+
+def realistic_partition(rows, seed=11):
+    rng = random.Random(seed)
+    questions = [f"Q{q}. {rng.choice(['Read', 'Add', 'Find'])} the {rng.choice(['word', 'sum'])}" for q in range(40)]
+    return pd.DataFrame({
+        'student_id': [f"S{rng.randint(0, rows // 40):06d}" for _ in range(rows)],
+        'assessment_type': 'Unit 1A',
+        'assessment_date': [rng.choice(['2024-07-15', '2024-07-16', None]) for _ in range(rows)],
+        'subject_name': [rng.choice(['English', 'Maths', 'Science']) for _ in range(rows)],
+        'question_name': [rng.choice(questions) for _ in range(rows)],
+        'competency_level_name': 'Developing',
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=2024)
+    args = parser.parse_args()
+
+    if not property_check(args.cases, args.seed):
+        sys.exit(1)
+    print(f"✅ {args.cases} random partitions: columnar keys match generate_assessment_id")
+
+    df = realistic_partition(args.rows)
+    start = time.perf_counter()
+    expected = scalar_ids(df)
+    t_scalar = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = generate_assessment_ids(df)
+    t_columnar = time.perf_counter() - start
+    assert actual.tolist() == expected
+
+    print(f"scalar  : {t_scalar:8.3f} s  ({len(df) / t_scalar:,.0f} rows/s)")
+    print(f"columnar: {t_columnar:8.3f} s  ({len(df) / t_columnar:,.0f} rows/s)")
+    print(f"speed-up: {t_scalar / t_columnar:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
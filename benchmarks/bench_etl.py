@@ -0,0 +1,570 @@
+"""
+Offline end-to-end benchmark of the assessment ETL against a stand-in API.
+
+Starts a local HTTP server that answers getAssessmentMarks.htm,
+getSchoolExamMarks.htm and getActiveStudents.htm with synthetic payloads
+(rows per response and response latency are configurable), then runs the
+ETL stages one after another over the whole sweep and reports, per stage,
+rows/s and the peak Python heap:
+
+    fetch   - ApiClient + fetch_partitions, bodies spooled as in production
+    parse   - streaming JSON decode into chunks (iter_json_array/iter_chunks)
+    clean   - transform.clean_frame (text cleaning, normalization, dates)
+    keygen  - transform.keyed_rows (generated assessment ids, row hashes)
+    upsert  - AssessmentEtl.upsert_rows (duplicate collapsing, change
+              detection, write) into an empty scratch copy of the
+              assessment table in a local MySQL database; upsert_bulk is
+              the same with write_mode = bulk (--write-mode picks one).
+              --key-mode hashed keys the table by the BINARY(16)
+              assessment_key; the report adds the table's index size
+
+Stages run single-threaded, one after the other, so each figure is the
+throughput of that stage alone. Peak memory comes from a second, traced
+run of the stage (tracemalloc slows the code down, so it is kept out of the
+timings); skip it with --no-memory.
+
+    python benchmarks/bench_etl.py --partitions 40 --rows 2000 --latency 0.05
+    python benchmarks/bench_etl.py --save baseline.json
+    python benchmarks/bench_etl.py --compare baseline.json --tolerance 0.2
+
+--compare exits with status 1 if any stage's rows/s dropped by more than
+the tolerance. --check-write-modes writes the rows once more with each write
+mode and exits with status 1 if executemany and bulk stored different rows
+(e.g. NULL marks of absent students). --check-rollups loads one assessment
+as 'UNIT 1' and again as 'Unit 1' (the second takes the stored rows over),
+refreshing the rollups after each like the ETL does, and exits with status 1
+if they differ from a full rebuild. Without a reachable database (or with --skip-upsert) the
+upsert stages are reported as skipped.
+"""
+import argparse
+import configparser
+import gc
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from edustems_etl.assessment_etl import AssessmentEtl
+from edustems_etl.hashed_key import migrate_to_hashed_key
+from edustems_etl.http_client import ApiClient
+from edustems_etl.json_stream import iter_chunks, iter_json_array
+from edustems_etl.pipeline import PartitionOutcome
+from edustems_etl.rollups import (COMPETENCY_TABLE, CREATE_COMPETENCY_TABLE, CREATE_SCORES_TABLE, SCORES_TABLE,
+                                  RollupMaintainer, rebuild_rollup_years)
+from edustems_etl.schema import ASSESSMENT_TABLE, CONTENT_COLUMNS, CREATE_ASSESSMENT_TABLE
+from edustems_etl.scheduler import Partition, fetch_partitions
+from edustems_etl.transform import clean_frame, keyed_rows
+
+BENCH_TABLE = 'bench_student_full_assessment_data'
+BENCH_PREFIX = 'bench_'
+SCHOOLS = ["ABMPS", "ANWEMS", "BNMCEMS", "BOPEMS", "CSMEMS", "DNMPS", "KCTVN", "LAPMEMS"]
+ASSESSMENT_TYPES = {
+    'Standardized': ["BOY", "MOY", "EOY", "UNIT 1", "UNIT 2", "Weekly Test 1"],
+    'Non-Standardized': ["Prelims 1", "Unit Test 2", "Term 1"],
+}
+SUBJECTS = ['English', 'Mathematics', 'Science', 'Hindi', 'Marathi', 'Social Studies']
+GRADES = ['Jr.KG', 'Sr.KG'] + [f'GRADE {r}' for r in ('I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X')]
+COMPETENCIES = ['Number Sense', 'reading  comprehension', 'Data Handling', 'Grammar &amp; Usage', '', None]
+FIRST_NAMES = ['ravi', 'SNEHA', 'aarav', 'Priya', 'mohammed', 'kavya', 'ANANYA', 'rohan']
+LAST_NAMES = ['kumar', 'Patil', 'SHAIKH', 'deshmukh', 'Jadhav', 'more']
+
+
+# ---------- Synthetic payloads ----------
+def assessment_rows(params, rows, category):
+    """Deterministic API rows for one school × year × assessment type."""
+    rng = random.Random('|'.join([category, params.get('school_name', ''), params.get('academic_year', ''),
+                                  params.get('assessment_type', '')]))
+    start_year = int(params.get('academic_year', '2024')[:4])
+    data = []
+    for i in range(rows):
+        student = i // 20
+        max_marks = rng.choice([10, 20, 25, 50, 100])
+        present = rng.choice(['P', 'P', 'P', 'A'])
+        # Absent students come without marks (NaN after the transform)
+        obtained = rng.randint(0, max_marks) if present == 'P' else None
+        data.append({
+            'studentId': f"S{student:06d}",
+            'studentName': f" {rng.choice(FIRST_NAMES)}  {rng.choice(LAST_NAMES)} ",
+            'gender': rng.choice(['male', 'FEMALE', 'Male', 'female']),
+            'schoolName': params.get('school_name'),
+            'subjectName': rng.choice(SUBJECTS),
+            'gradeName': GRADES[student % len(GRADES)],
+            'divisionName': f"{student % 10 + 1}-{'ABCD'[student % 4]}",
+            'courseName': 'Regular',
+            'questionName': f"Q{i % 20 + 1}. {rng.choice(['Identify the main idea', 'Solve', 'fill in the blanks'])}",
+            'description': rng.choice(['Reads fluently', 'Adds two-digit numbers', 'Writes a paragraph']),
+            'competencyLevelName': '' if category == 'Non-Standardized' else rng.choice(COMPETENCIES),
+            'assessmentDate': f"{rng.randint(1, 28):02d}/{rng.randint(6, 12):02d}/{start_year}",
+            'obtainedMarks': obtained,
+            'maxMarks': max_marks,
+            'percentage': None if obtained is None else round(100 * obtained / max_marks, 2),
+            'presentAbsent': present,
+            'assessmentId': f"A{rng.randint(1, 500)}",
+        })
+    return data
+
+
+def student_rows(rows):
+    rng = random.Random('students')
+    return [{
+        'school_name': rng.choice(SCHOOLS),
+        'student_id': f"S{i:06d}",
+        'student_name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        'grade_name': rng.choice(GRADES),
+        'gender': rng.choice(['MALE', 'FEMALE']),
+        'division_name': f"{i % 10 + 1}-A",
+        'status': 'Active',
+        'created_date': f"{rng.randint(1, 28):02d}/06/2024",
+    } for i in range(rows)]
+
+
+class StandInServer:
+    """Local stand-in for the edustems API serving synthetic JSON bodies."""
+
+    def __init__(self, rows=1000, latency=0.0, student_rows=5000):
+        self.rows = rows
+        self.latency = latency
+        self.student_rows = student_rows
+        self._bodies = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                body = server.body(url.path.rsplit('/', 1)[-1], params)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def body(self, endpoint, params):
+        if endpoint == 'getAssessmentMarks.htm':
+            build = lambda: assessment_rows(params, self.rows, 'Standardized')
+        elif endpoint == 'getSchoolExamMarks.htm':
+            build = lambda: assessment_rows(params, self.rows, 'Non-Standardized')
+        elif endpoint == 'getActiveStudents.htm':
+            build = lambda: student_rows(self.student_rows)
+        else:
+            return None
+        key = (endpoint, tuple(sorted(params.items())))
+        with self._lock:
+            body = self._bodies.get(key)
+        if body is None:
+            # Serialized once per partition, so fetch timings exclude payload generation
+            body = json.dumps({'status': 'ok', 'data': build()}).encode('utf-8')
+            with self._lock:
+                self._bodies[key] = body
+        return body
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def build_partitions(count, start_year):
+    partitions = []
+    year = start_year
+    while len(partitions) < count:
+        for category, types in ASSESSMENT_TYPES.items():
+            for school in SCHOOLS:
+                for assessment_type in types:
+                    partitions.append(Partition(category, f"{year}-{year + 1}", school, assessment_type))
+        year += 1
+    return partitions[:count]
+
+
+def endpoint_url(base_url, partition):
+    endpoint = 'getAssessmentMarks.htm' if partition.assessment_category == 'Standardized' else 'getSchoolExamMarks.htm'
+    return f"{base_url}/{endpoint}"
+
+
+# ---------- Stages ----------
+def stage_fetch(ctx):
+    client = ApiClient(pool_size=ctx.workers)
+    url_fn = lambda partition: endpoint_url(ctx.base_url, partition)
+
+    def fetch(partition):
+        return client.fetch(url_fn(partition), {
+            'api-key': 'bench', 'school_name': partition.school_name,
+            'academic_year': partition.academic_year, 'assessment_type': partition.assessment_type,
+        })
+
+    payloads = []
+    try:
+        for partition, payload, error in fetch_partitions(ctx.partitions, fetch, url_fn,
+                                                          max_workers=ctx.workers, per_host_limit=ctx.workers):
+            if error:
+                raise error
+            payloads.append((partition, payload))
+        students = client.fetch(f"{ctx.base_url}/getActiveStudents.htm", {'api-key': 'bench', 'school_name': 'ALL'})
+    finally:
+        client.close()
+    return payloads + [(None, students)]
+
+
+def stage_parse(ctx, payloads):
+    chunks = []
+    rows = 0
+    for partition, payload in payloads:
+        payload.seek(0)
+        for chunk in iter_chunks(iter_json_array(payload), ctx.chunk_size):
+            rows += len(chunk)
+            if partition is not None:
+                chunks.append((partition, chunk))
+    return chunks, rows
+
+
+def stage_clean(ctx, chunks):
+    return [clean_frame(partition, chunk)[0] for partition, chunk in chunks]
+
+
+def stage_keygen(ctx, frames):
+    return [keyed_rows(df) for df in frames]
+
+
+def stage_upsert(ctx, row_chunks):
+    # Every run (timed and traced) starts from an empty table, so both insert
+    create_bench_table(ctx.conn, ctx.key_mode)
+    counts = Counter()
+    for rows in row_chunks:
+        ctx.etl.upsert_rows(ctx.conn, rows, counts, table=BENCH_TABLE)
+    return counts
+
+
+def create_bench_table(conn, key_mode):
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cursor.execute(CREATE_ASSESSMENT_TABLE.replace(ASSESSMENT_TABLE, BENCH_TABLE, 1))
+    conn.commit()
+    if key_mode == 'hashed':
+        migrate_to_hashed_key(conn, BENCH_TABLE)
+
+
+def bench_engine(args, write_mode):
+    """AssessmentEtl writing like production with `write_mode`, connected to the bench database."""
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({
+        'mysql': {'host': args.db_host, 'port': str(args.db_port), 'user': args.db_user,
+                  'password': args.db_password, 'database': args.db_name},
+        'etl': {'max_workers': '1', 'write_mode': write_mode, 'key_mode': args.key_mode,
+                'write_chunk_rows': str(args.write_rows)},
+        'rate_control': {'enabled': 'false'},
+        'rollups': {'enabled': 'false'},
+    })
+    return AssessmentEtl(config)
+
+
+def stored_rows(conn):
+    columns = ', '.join(CONTENT_COLUMNS + ['assessment_id_generated', 'row_hash'])
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT {columns} FROM {BENCH_TABLE} ORDER BY id")
+        return cursor.fetchall()
+
+
+def check_write_modes(args, row_chunks):
+    """
+    Write the same rows (absent students carry NaN marks) with executemany
+    and with bulk, and compare what each stored. Returns the number of
+    differing rows, or None without a database.
+    """
+    stored = {}
+    for write_mode in ('executemany', 'bulk'):
+        etl = bench_engine(args, write_mode)
+        try:
+            conn = etl.db.get()
+        except Exception as e:
+            print(f"write-mode check skipped (no database: {e})")
+            etl.close()
+            return None
+        try:
+            create_bench_table(conn, args.key_mode)
+            for rows in row_chunks:
+                etl.upsert_rows(conn, rows, table=BENCH_TABLE)
+            stored[write_mode] = stored_rows(conn)
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        finally:
+            etl.db.release(conn)
+            etl.close()
+    executemany, bulk = stored['executemany'], stored['bulk']
+    differing = sum(1 for a, b in zip(executemany, bulk) if a != b) + abs(len(executemany) - len(bulk))
+    nulls = sum(1 for row in executemany if row[CONTENT_COLUMNS.index('obtained_marks')] is None)
+    print(f"write-mode check: {len(executemany)} rows ({nulls} with NULL marks), {differing} differ between executemany and bulk")
+    return differing
+
+
+def rollup_rows(conn):
+    """Rows of both scratch rollup tables, without their refresh times."""
+    rows = set()
+    with conn.cursor() as cursor:
+        for table in (SCORES_TABLE, COMPETENCY_TABLE):
+            cursor.execute(f"SELECT * FROM {BENCH_PREFIX}{table}")
+            columns = [d[0] for d in cursor.description]
+            kept = [i for i, col in enumerate(columns) if col != 'refreshed_at']
+            rows.update((table,) + tuple(row[i] for i in kept) for row in cursor.fetchall())
+    return rows
+
+
+def check_rollups(args):
+    """
+    Write one assessment as 'UNIT 1', then as 'Unit 1' (same 'UNI' keys, later
+    in the sweep, so it takes the stored rows over), refreshing the rollups
+    after each partition like the ETL's completion callback. Returns the
+    number of rollup rows that differ from a full rebuild, or None without a
+    database.
+    """
+    etl = bench_engine(args, 'executemany')
+    try:
+        conn = etl.db.get()
+    except Exception as e:
+        print(f"rollup check skipped (no database: {e})")
+        etl.close()
+        return None
+    try:
+        create_bench_table(conn, args.key_mode)
+        with conn.cursor() as cursor:
+            for table, create in ((SCORES_TABLE, CREATE_SCORES_TABLE), (COMPETENCY_TABLE, CREATE_COMPETENCY_TABLE)):
+                cursor.execute(f"DROP TABLE IF EXISTS {BENCH_PREFIX}{table}")
+                cursor.execute(create.replace(table, BENCH_PREFIX + table, 1))
+        conn.commit()
+        etl.rollups = RollupMaintainer(BENCH_TABLE, BENCH_PREFIX)
+
+        academic_year = f"{args.start_year}-{args.start_year + 1}"
+        data = assessment_rows({'school_name': SCHOOLS[0], 'academic_year': academic_year,
+                                'assessment_type': 'UNIT 1'}, args.rows, 'Non-Standardized')
+        for assessment_type in ('UNIT 1', 'Unit 1'):
+            partition = Partition('Non-Standardized', academic_year, SCHOOLS[0], assessment_type)
+            outcome = PartitionOutcome()
+            etl.upsert_rows(conn, keyed_rows(clean_frame(partition, data)[0]), outcome.change_counts,
+                            outcome.displaced, table=BENCH_TABLE)
+            etl.refresh_rollups(conn, partition, outcome)
+        moved = outcome.change_counts['changed']
+
+        refreshed = rollup_rows(conn)
+        rebuild_rollup_years(conn, [academic_year], BENCH_TABLE, BENCH_PREFIX)
+        differing = len(refreshed ^ rollup_rows(conn))
+        with conn.cursor() as cursor:
+            for table in (BENCH_TABLE, BENCH_PREFIX + SCORES_TABLE, BENCH_PREFIX + COMPETENCY_TABLE):
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    finally:
+        etl.db.release(conn)
+        etl.close()
+    print(f"rollup check: {moved} rows moved from 'UNIT 1' to 'Unit 1', "
+          f"{differing} rollup rows differ from a full rebuild")
+    return differing
+
+
+def index_megabytes(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"ANALYZE TABLE {BENCH_TABLE}")
+        cursor.fetchall()
+        cursor.execute(
+            "SELECT INDEX_LENGTH FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (BENCH_TABLE,)
+        )
+        return round(cursor.fetchone()[0] / 1048576, 2)
+
+
+def measure(fn, *args, memory=True, discard=None):
+    """
+    (result, seconds, peak_heap_bytes or None) of fn(*args). The result of
+    the traced run is passed to `discard` (e.g. to close what it opened).
+    """
+    gc.collect()
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        traced = fn(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if discard is not None:
+            discard(traced)
+    return result, elapsed, peak
+
+
+def close_payloads(payloads):
+    for _, payload in payloads:
+        payload.close()
+
+
+def stage_result(rows, elapsed, peak):
+    return {'rows': rows, 'seconds': round(elapsed, 4),
+            'rows_per_sec': round(rows / elapsed, 1) if elapsed else 0.0,
+            'peak_mb': None if peak is None else round(peak / 1048576, 2)}
+
+
+def run(args):
+    class Context:
+        pass
+    ctx = Context()
+    ctx.workers, ctx.chunk_size = args.workers, args.chunk_size
+    ctx.key_mode = args.key_mode
+    ctx.partitions = build_partitions(args.partitions, args.start_year)
+    results = {}
+
+    with StandInServer(rows=args.rows, latency=args.latency, student_rows=args.students) as server:
+        ctx.base_url = server.url
+        # Warm the server's body cache so fetch measures transfer, not payload generation
+        for partition in ctx.partitions:
+            server.body(endpoint_url('', partition).lstrip('/'), {
+                'api-key': 'bench', 'school_name': partition.school_name,
+                'academic_year': partition.academic_year, 'assessment_type': partition.assessment_type})
+        server.body('getActiveStudents.htm', {'api-key': 'bench', 'school_name': 'ALL'})
+
+        payloads, elapsed, peak = measure(stage_fetch, ctx, memory=args.memory, discard=close_payloads)
+        total_rows = len(ctx.partitions) * args.rows + args.students
+        results['fetch'] = stage_result(total_rows, elapsed, peak)
+        results['fetch']['mb'] = round(sum(p.seek(0, 2) for _, p in payloads) / 1048576, 2)
+
+    (chunks, parsed_rows), elapsed, peak = measure(stage_parse, ctx, payloads, memory=args.memory)
+    results['parse'] = stage_result(parsed_rows, elapsed, peak)
+    close_payloads(payloads)
+
+    assessment_rows_total = sum(len(chunk) for _, chunk in chunks)
+    frames, elapsed, peak = measure(stage_clean, ctx, chunks, memory=args.memory)
+    results['clean'] = stage_result(assessment_rows_total, elapsed, peak)
+    del chunks
+
+    row_chunks, elapsed, peak = measure(stage_keygen, ctx, frames, memory=args.memory)
+    results['keygen'] = stage_result(assessment_rows_total, elapsed, peak)
+    del frames
+
+    write_modes = ('executemany', 'bulk') if args.write_mode == 'both' else (args.write_mode,)
+    for write_mode in write_modes:
+        stage = 'upsert' if write_mode == 'executemany' else 'upsert_bulk'
+        if args.skip_upsert:
+            results[stage] = {'skipped': 'disabled with --skip-upsert'}
+            continue
+        ctx.etl = bench_engine(args, write_mode)
+        try:
+            ctx.conn = ctx.etl.db.get()
+        except Exception as e:
+            results[stage] = {'skipped': f"no database: {e}"}
+            ctx.etl.close()
+            continue
+        try:
+            counts, elapsed, peak = measure(stage_upsert, ctx, row_chunks, memory=args.memory)
+            results[stage] = stage_result(assessment_rows_total, elapsed, peak)
+            results[stage].update(inserted=counts['inserted'], duplicates=counts['duplicates'],
+                                  index_mb=index_megabytes(ctx.conn))
+            with ctx.conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        finally:
+            ctx.etl.db.release(ctx.conn)
+            ctx.etl.close()
+
+    report = {
+        'settings': {k: v for k, v in vars(args).items() if k not in ('db_password', 'save', 'compare')},
+        'stages': results,
+    }
+    if args.check_write_modes:
+        report['write_mode_differences'] = check_write_modes(args, row_chunks)
+    if args.check_rollups:
+        report['rollup_differences'] = check_rollups(args)
+    return report
+
+
+def print_report(report):
+    print(f"{'stage':<8} {'rows':>10} {'seconds':>9} {'rows/s':>12} {'peak MB':>9}")
+    for name, r in report['stages'].items():
+        if 'skipped' in r:
+            print(f"{name:<8} skipped ({r['skipped']})")
+            continue
+        peak = '-' if r['peak_mb'] is None else f"{r['peak_mb']:.1f}"
+        print(f"{name:<8} {r['rows']:>10} {r['seconds']:>9.3f} {r['rows_per_sec']:>12,.0f} {peak:>9}")
+        if 'index_mb' in r:
+            print(f"{'':<8} index size {r['index_mb']:.1f} MB")
+
+
+def compare(report, baseline, tolerance):
+    """Stages whose throughput dropped by more than `tolerance` (a fraction)."""
+    regressions = []
+    for name, r in report['stages'].items():
+        before = baseline.get('stages', {}).get(name, {})
+        if 'rows_per_sec' not in r or not before.get('rows_per_sec'):
+            continue
+        change = r['rows_per_sec'] / before['rows_per_sec'] - 1
+        print(f"{name:<8} {before['rows_per_sec']:>12,.0f} -> {r['rows_per_sec']:>12,.0f} rows/s ({change:+.1%})")
+        if change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--partitions', type=int, default=40, help="assessment partitions in the sweep")
+    parser.add_argument('--rows', type=int, default=2000, help="rows per assessment response")
+    parser.add_argument('--students', type=int, default=20000, help="rows in the getActiveStudents response")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds the stand-in waits before answering")
+    parser.add_argument('--start-year', type=int, default=2024)
+    parser.add_argument('--workers', type=int, default=4, help="concurrent fetches")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="rows per transform chunk")
+    parser.add_argument('--write-rows', type=int, default=1000, help="rows per upsert statement")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip the traced peak-memory runs")
+    parser.add_argument('--skip-upsert', action='store_true')
+    parser.add_argument('--check-write-modes', action='store_true',
+                        help="also check that executemany and bulk store identical rows (exit 1 if not)")
+    parser.add_argument('--check-rollups', action='store_true',
+                        help="also check that incremental rollup refreshes match a rebuild when rows move "
+                             "between alias partitions (exit 1 if not)")
+    parser.add_argument('--write-mode', choices=('executemany', 'bulk', 'both'), default='both',
+                        help="upsert stage(s) to run (see [etl] write_mode)")
+    parser.add_argument('--key-mode', choices=('readable', 'hashed'), default='readable',
+                        help="upsert key of the scratch table (see [etl] key_mode)")
+    parser.add_argument('--db-host', default='127.0.0.1')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', default='root')
+    parser.add_argument('--db-password', default='')
+    parser.add_argument('--db-name', default='edustems_bench')
+    parser.add_argument('--save', help="write the report as JSON to this file")
+    parser.add_argument('--compare', help="baseline JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed rows/s drop before --compare fails")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+    if report.get('write_mode_differences') or report.get('rollup_differences'):
+        sys.exit(1)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regression beyond {args.tolerance:.0%} in: {', '.join(regressions)}")
+            sys.exit(1)
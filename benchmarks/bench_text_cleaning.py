@@ -0,0 +1,123 @@
+"""
+Benchmark: per-cell text cleaning vs the factorized cleaning engine.
+
+Builds a synthetic exam-marks partition shaped like getSchoolExamMarks.htm
+output (many students × the same questions), runs the legacy row-wise
+functions and edustems_etl.text_cleaning on copies of it, checks the outputs
+are identical cell for cell, and prints the timings.
+
+    python benchmarks/bench_text_cleaning.py --students 2000 --questions 40
+"""
+import argparse
+import html
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from edustems_etl.text_cleaning import clean_and_format_text, fill_competency_from_description
+
+
+# ---------- Legacy implementation (reference) ----------
+def legacy_trim_string(value):
+    return html.unescape(str(value).strip()) if isinstance(value, str) else value
+
+def legacy_clean_and_format_text(df):
+    text_cols = ['student_name', 'subject_name', 'question_name', 'description', 'competency_level_name']
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].apply(legacy_trim_string)
+            df[col] = df[col].str.replace(r'\s+', ' ', regex=True).str.strip()
+            if col in text_cols:
+                df[col] = df[col].apply(lambda x: ' '.join([w.capitalize() for w in x.split()]) if isinstance(x, str) else x)
+    return df
+
+def legacy_fill_competency(df):
+    return df.apply(
+        lambda row: row['description'] if pd.isna(row.get('competency_level_name')) or row['competency_level_name'] in [None, '', 'NaN'] else row['competency_level_name'],
+        axis=1
+    )
+
+
+# ---------- Synthetic data ----------
+def synthetic_partition(students, questions, seed=7):
+    rng = random.Random(seed)
+    words = ['reading', 'WRITING', 'number', 'sense', 'fractions', 'o\'neil', 'grade-3', 'll', 'ǆemal']
+    names = [f"  {rng.choice(['aarav', 'SIYA', 'ananya  patil', 'rahul&amp;co'])}\t{i} " for i in range(students)]
+    question_texts = [f"Q{q}. {' '.join(rng.choice(words) for _ in range(rng.randint(1, 8)))} &lt;b&gt;" for q in range(questions)]
+    competencies = ['Beginner', '  developing ', 'PROFICIENT', '', 'NaN', None]
+    rows = []
+    for s in range(students):
+        for q in range(questions):
+            rows.append({
+                'student_id': f"S{s:06d}",
+                'student_name': names[s],
+                'gender': rng.choice(['F', 'male', ' Girl ', None]),
+                'school_name': 'ABMPS',
+                'subject_name': rng.choice(['english', 'MATHS', ' science ']),
+                'grade_name': rng.choice(['Grade III', 'grade 4', 'Sr KG']),
+                'division_name': rng.choice(['3-A', 'B', ' 4 c ']),
+                'question_name': question_texts[q],
+                'description': rng.choice(['Identifies  main idea', 'adds fractions', None]),
+                'competency_level_name': rng.choice(competencies),
+                'obtained_marks': rng.choice([1, 2.5, None]),
+                'max_marks': 5,
+                'mixed': rng.choice(['text', 3, None, float('nan')]),
+            })
+    return pd.DataFrame(rows)
+
+
+def identical(left, right):
+    if list(left.columns) != list(right.columns) or not left.index.equals(right.index):
+        return False
+    for col in left.columns:
+        if left[col].dtype != right[col].dtype:
+            return False
+        for a, b in zip(left[col].tolist(), right[col].tolist()):
+            if type(a) is not type(b):
+                return False
+            if a != b and not (a != a and b != b):
+                return False
+    return True
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--questions', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    base = synthetic_partition(args.students, args.questions)
+    print(f"Partition: {len(base)} rows × {len(base.columns)} columns")
+
+    legacy_times, engine_times = [], []
+    for _ in range(args.repeat):
+        legacy, t_legacy = timed(legacy_clean_and_format_text, base.copy())
+        legacy_comp, t_legacy_comp = timed(legacy_fill_competency, legacy)
+        engine, t_engine = timed(clean_and_format_text, base.copy())
+        engine_comp, t_engine_comp = timed(fill_competency_from_description, engine)
+        legacy_times.append(t_legacy + t_legacy_comp)
+        engine_times.append(t_engine + t_engine_comp)
+
+    if not identical(legacy, engine) or not identical(legacy_comp.to_frame('competency'), engine_comp.to_frame('competency')):
+        print("❌ Outputs differ")
+        sys.exit(1)
+
+    best_legacy, best_engine = min(legacy_times), min(engine_times)
+    print(f"legacy  : {best_legacy:8.3f} s  ({len(base) / best_legacy:,.0f} rows/s)")
+    print(f"engine  : {best_engine:8.3f} s  ({len(base) / best_engine:,.0f} rows/s)")
+    print(f"speed-up: {best_legacy / best_engine:.1f}x  ✅ outputs identical")
+
+
+if __name__ == '__main__':
+    main()
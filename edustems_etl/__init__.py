@@ -0,0 +1 @@
+"""Shared building blocks for the edustems → MySQL ETL scripts."""
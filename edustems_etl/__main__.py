@@ -0,0 +1,5 @@
+from edustems_etl.cli import main
+
+# Guarded: spawned transform workers re-import the main module
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,693 @@
+"""Assessment marks ETL: edustems API → student_full_assessment_data.
+
+One engine behind every mode of the CLI (see `edustems_etl.cli`):
+
+    backfill     sweep academic years partition by partition; closed years are
+                 served from the response cache, known-empty partitions skipped,
+                 finished partitions checkpointed so `--resume` can pick up a
+                 killed sweep
+    replay       the backfill from cached responses only, without network
+    incremental  current year; partitions whose payload fingerprint matches
+                 their sync watermark are skipped without parsing
+    rollups      rebuild the dashboard rollup tables of whole academic years;
+                 backfill and incremental refresh the slices they change
+    freeze       mark closed academic years final: backfill and replay skip
+                 their partitions unless a check of the stored rows shows
+                 drift (see `edustems_etl.frozen_years`); `unfreeze` undoes it
+
+Importing this module has no side effects: config is read and logging set up
+by the caller, and `AssessmentEtl` opens its HTTP and MySQL pools when it is
+created. pandas is not imported here at all; transforms load it in the
+worker processes (or on first use when transform_workers = 0), so a run whose
+partitions are all unchanged never pays for it.
+"""
+import hashlib
+import logging
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+
+import mysql.connector
+
+from edustems_etl.bulk_load import bulk_upsert
+from edustems_etl.change_detection import ensure_row_hash_column, skip_unchanged_rows
+from edustems_etl.checkpoint import journal_from_config
+from edustems_etl.chunked_writer import WriteStats, write_chunks
+from edustems_etl.db import ConnectionManager
+from edustems_etl.empty_partitions import EmptyPartitionIndex, create_empty_partitions_table
+from edustems_etl.frozen_years import create_frozen_tables, freeze_years, frozen_years_from_config, unfreeze_years
+from edustems_etl.hashed_key import KeyMigrationError, hashed_key_active, identity_key, migrate_to_hashed_key
+from edustems_etl.http_client import client_from_config
+from edustems_etl.json_stream import stream_digest
+from edustems_etl.metrics import metrics_from_config
+from edustems_etl.pipeline import Pipeline
+from edustems_etl.rate_control import limiter_from_config
+from edustems_etl.response_cache import ResponseCache
+from edustems_etl.rollups import RollupMaintainer, create_rollup_tables, rebuild_rollup_years
+from edustems_etl.scheduler import Partition, fetch_partitions
+from edustems_etl.schema import (ASSESSMENT_TABLE, CREATE_ASSESSMENT_TABLE, HASHED_KEY_COLUMN, HASHED_WRITE_COLUMNS,
+                                 WRITE_COLUMNS)
+from edustems_etl.sync_state import create_sync_state_table, load_sync_states, save_sync_state, touch_sync_state
+
+CATEGORIES = ('Standardized', 'Non-Standardized')
+
+SCHOOL_NAMES = [
+    "ABMPS", "ANWEMS", "BNMCEMS", "BOPEMS", "CSMEMS",
+    "DNMPS", "KCTVN", "LAPMEMS", "LBBNMCEMS", "LDRKEMS",
+    "LGRMNMCEMS", "LNMPS", "MEMS", "MLMPS", "MPMMPS",
+    "NMMC93", "NNMPS", "PKGEMS", "RDNMCEMS",
+    "RMNMCEMS", "SMCMPS", "SMPS", "WBMPS", "SBP", "SBPMO", "RNMCEMS"
+]
+
+STANDARDIZED_TYPES = ["BOY", "MOY", "EOY"]
+NON_STANDARDIZED_TYPES = [
+    "UNIT 1", "UNIT 2", "UNIT 3", "UNIT 4", "UNIT 5",
+    "Unit 1A", "Unit 2A", "Unit 3A", "Unit 4A", "Unit 5A",
+    "unit 1 A", "unit 2 A", "unit 3 A", "unit 4 A", "unit 5 A",
+    "unit 1 B", "unit 2 B", "unit 3 B", "unit 4 B", "unit 5 B",
+    "Unit 1B", "Unit 2B", "Unit 3B", "Unit 4B", "Unit 5B",
+    "Weekly 1", "Weekly 2", "Weekly 3", "Weekly 4", "Weekly 5",
+    "Prelim 1", "Prelim 2", "Prelim 3", "Prelim 4", "Prelim 5",
+    "Unit 1", "Unit 2", "Unit 3", "Unit 4", "Unit 5"
+]
+ASSESSMENT_TYPES = STANDARDIZED_TYPES + NON_STANDARDIZED_TYPES
+
+# The incremental sync asks each endpoint only for its own types; the backfill
+# sweeps every type under both categories.
+TYPES_BY_CATEGORY = {'Standardized': STANDARDIZED_TYPES, 'Non-Standardized': NON_STANDARDIZED_TYPES}
+
+
+def current_academic_year(now=None):
+    """Academic year ('2025-2026') in progress; years start in June."""
+    now = now or datetime.now()
+    year = now.year if now.month >= 6 else now.year - 1
+    return f"{year}-{year + 1}"
+
+
+def academic_years(start_year, end_year=None):
+    end_year = end_year or int(current_academic_year()[:4])
+    return [f"{year}-{year + 1}" for year in range(start_year, end_year + 1)]
+
+
+def build_partitions(categories, years, schools, types_by_category):
+    """Partitions in sweep order: category, academic year, school, assessment type."""
+    return [
+        Partition(category, year, school, assessment_type)
+        for category in categories
+        for year in years
+        for school in schools
+        for assessment_type in types_by_category[category]
+    ]
+
+
+def transform_partition_chunk(partition, data):
+    """`transform_chunk`, imported on first call so only transforming processes load pandas."""
+    from edustems_etl.transform import transform_chunk
+    return transform_chunk(partition, data)
+
+
+def _describe(partition):
+    return f"{partition.school_name} - {partition.academic_year} - {partition.assessment_type}"
+
+
+def _sweep_rank(owner):
+    """Position of a partition owner (Partition fields) in sweep order; unknown ones sort last."""
+    category, assessment_type = owner[0], owner[3]
+    return (CATEGORIES.index(category) if category in CATEGORIES else len(CATEGORIES),
+            ASSESSMENT_TYPES.index(assessment_type) if assessment_type in ASSESSMENT_TYPES else len(ASSESSMENT_TYPES),
+            assessment_type or '')
+
+
+def _later_in_sweep(stored_owner, row_owner):
+    """Whether the partition that stored a row comes after the one writing it (and so keeps the row)."""
+    return _sweep_rank(stored_owner) > _sweep_rank(row_owner)
+
+
+def _key_group(partition):
+    """
+    Partitions whose rows can share an upsert key: the readable key keeps
+    only the first three letters of the type, upper-cased ('UNIT 1',
+    'Unit 1A', ... → 'UNI'), and every type is swept under both categories.
+    One writer handles a group, in sweep order, so aliases never race.
+    """
+    return partition.academic_year, partition.school_name, partition.assessment_type[:3].upper()
+
+
+def _describe_changes(outcome):
+    counts = outcome.change_counts
+    text = f"inserted {counts['inserted']}, updated {counts['changed']}, unchanged {counts['unchanged']}"
+    if counts['duplicates']:
+        text += f", duplicates dropped {counts['duplicates']}"
+    return text
+
+
+def _count_changes(partition, outcome, change_counts, duplicates):
+    change_counts.update(outcome.change_counts)
+    if outcome.change_counts['duplicates']:
+        duplicates[partition.school_name, partition.assessment_type] += outcome.change_counts['duplicates']
+
+
+def _landing_zone(config):
+    # The landing module imports pyarrow, so it is only loaded when enabled
+    if not config.getboolean('landing', 'enabled', fallback=False):
+        return None
+    from edustems_etl.landing import landing_from_config
+    return landing_from_config(config)
+
+
+class AssessmentEtl:
+    """Settings, pools and runs of the assessment ETL for one config."""
+
+    def __init__(self, config):
+        self.config = config
+        self.api_url_base = config.get('api', 'url', fallback='https://akanksha.edustems.com').rstrip('/')
+        self.api_key = config.get('api', 'key', fallback='default_api_key')
+        db_config = {
+            'user': config['mysql']['user'],
+            'password': config['mysql']['password'],
+            'host': config['mysql']['host'],
+            'port': int(config['mysql']['port']),
+            'database': config['mysql']['database']
+        }
+
+        self.max_workers = config.getint('etl', 'max_workers', fallback=4)
+        self.per_host_limit = config.getint('etl', 'per_host_limit', fallback=4)
+        self.request_interval = config.getfloat('etl', 'request_interval', fallback=0.0)
+        self.chunk_size = config.getint('etl', 'chunk_size', fallback=5000)
+        # 'executemany' (chunked multi-row ON DUPLICATE KEY UPDATE) or 'bulk' (staging table + set-based merge)
+        self.write_mode = config.get('etl', 'write_mode', fallback='executemany').strip().lower()
+        self.write_chunk_rows = config.getint('etl', 'write_chunk_rows', fallback=1000)
+        self.write_chunk_bytes = config.getint('etl', 'write_chunk_bytes', fallback=2 * 1024 * 1024)
+        # 'readable' (unique assessment_id_generated) or 'hashed' (unique BINARY(16) assessment_key, see hashed_key)
+        self.key_mode = config.get('etl', 'key_mode', fallback='readable').strip().lower()
+        # Known-empty partitions re-requested per run even though their entry is still fresh
+        self.empty_reprobe_limit = config.getint('etl', 'empty_reprobe_limit', fallback=25)
+        # Pipeline stages: transform processes (0 = transform on the feeding thread), DB writer threads
+        self.transform_workers = config.getint('etl', 'transform_workers', fallback=2)
+        self.writer_workers = config.getint('etl', 'writer_workers', fallback=2)
+        self.pipeline_queue_size = config.getint('etl', 'pipeline_queue_size', fallback=4)
+
+        # Raw responses of closed academic years are reused for up to ttl_days; the
+        # current year is always fetched (and stored, so replay can run offline).
+        self.cache_enabled = config.getboolean('cache', 'enabled', fallback=True)
+        self.cache_dir = config.get('cache', 'directory', fallback='response_cache')
+        self.cache_ttl = config.getfloat('cache', 'ttl_days', fallback=30) * 86400
+        self.cache_max_bytes = config.getint('cache', 'max_size_mb', fallback=2048) * 1024 * 1024
+
+        self.write_stats = WriteStats()
+        self.landing = _landing_zone(config)
+        # Dashboard rollups: slices of partitions with inserted/changed rows are re-aggregated
+        self.rollups = RollupMaintainer() if config.getboolean('rollups', 'enabled', fallback=True) else None
+        # Requests in flight and their spacing follow the API's health between the
+        # [rate_control] floor and ceiling; the fetch pool is sized for the ceiling
+        self.rate_limiter = limiter_from_config(config, self.per_host_limit, self.request_interval)
+        self.fetch_workers = self.max_workers
+        if self.rate_limiter is not None:
+            self.fetch_workers = max(self.max_workers, self.rate_limiter.max_limit)
+        # One pooled, retrying client shared by the fetch workers
+        self.api_client = client_from_config(
+            config, pool_size=self.fetch_workers,
+            observer=None if self.rate_limiter is None else self.rate_limiter.observe
+        )
+        # LOAD DATA LOCAL INFILE must be allowed client-side for the bulk writer
+        self.db = ConnectionManager(db_config, pool_size=self.max_workers, charset='utf8mb4',
+                                    allow_local_infile=(self.write_mode == 'bulk'))
+
+    # ---------- database ----------
+    def connect(self):
+        try:
+            conn = self.db.get()
+            logging.info("Connected to MySQL")
+            return conn
+        except mysql.connector.Error as err:
+            logging.error(f"MySQL connection failed: {err}")
+        return None
+
+    def prepare_tables(self, conn):
+        """Create/upgrade the tables of a run; False if the run cannot write."""
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(CREATE_ASSESSMENT_TABLE)
+            conn.commit()
+        except mysql.connector.Error as err:
+            logging.error(f"Failed to create table: {err}")
+        ensure_row_hash_column(conn, ASSESSMENT_TABLE)
+        if self.key_mode != 'hashed':
+            try:
+                migrated = hashed_key_active(conn, ASSESSMENT_TABLE)
+            except mysql.connector.Error as err:
+                logging.error(f"Cannot check the upsert key of {ASSESSMENT_TABLE}: {err}")
+                return False
+            if migrated:
+                # Readable-mode rows would lack assessment_key, and the readable key is no longer indexed
+                logging.warning(f"{ASSESSMENT_TABLE} uses the hashed key; running with key_mode = hashed "
+                                f"(set it in the config to silence this)")
+                self.key_mode = 'hashed'
+        if self.key_mode == 'hashed':
+            try:
+                migrate_to_hashed_key(conn, ASSESSMENT_TABLE)
+            except (mysql.connector.Error, KeyMigrationError) as err:
+                conn.rollback()
+                logging.error(f"Cannot switch {ASSESSMENT_TABLE} to the hashed key: {err}")
+                return False
+        if self.rollups is not None:
+            try:
+                create_rollup_tables(conn)
+            except mysql.connector.Error as err:
+                logging.error(f"Failed to create rollup tables: {err}")
+        return True
+
+    def refresh_rollups(self, conn, partition, outcome):
+        """
+        Re-aggregate the dashboard rollups of a partition whose rows changed,
+        and of the partitions it took stored rows from.
+        """
+        if self.rollups is None or not (outcome.change_counts['inserted'] or outcome.change_counts['changed']):
+            return
+        slices = [partition] + [Partition(*owner) for owner in sorted(outcome.displaced, key=str)
+                                if Partition(*owner) != partition]
+        for rollup_slice in slices:
+            try:
+                self.rollups.refresh(conn, rollup_slice)
+            except mysql.connector.Error as err:
+                # The rows are stored; only the rollup slice is stale until the next change or a rebuild
+                logging.error(f"Rollup refresh failed for {_describe(rollup_slice)}: {err} "
+                              f"(rebuild with: python -m edustems_etl rollups --years {rollup_slice.academic_year})")
+
+    def rebuild_rollups(self, academic_years=None):
+        """Recompute the rollup tables of `academic_years` (default: every stored year)."""
+        conn = self.connect()
+        if not conn:
+            return
+        started = time.monotonic()
+        try:
+            create_rollup_tables(conn)
+            years = rebuild_rollup_years(conn, academic_years)
+            logging.info(f"Rollups rebuilt for {len(years)} academic years ({', '.join(years)}) "
+                         f"in {time.monotonic() - started:.1f}s")
+        except mysql.connector.Error as err:
+            logging.error(f"Rollup rebuild failed: {err}")
+        finally:
+            self.db.release(conn)
+
+    def freeze(self, academic_years):
+        """Mark closed `academic_years` final, fingerprinting their stored partitions."""
+        current = current_academic_year()
+        refused = [year for year in academic_years if year >= current]
+        if refused:
+            logging.error(f"Only closed academic years can be frozen (current: {current}): {', '.join(refused)}")
+            return
+        conn = self.connect()
+        if not conn:
+            return
+        try:
+            create_frozen_tables(conn)
+            for year, (partitions, rows) in sorted(freeze_years(conn, academic_years).items()):
+                if not rows:
+                    logging.warning(f"Frozen {year} with no stored rows: backfills will skip it entirely")
+                logging.info(f"Frozen {year}: {partitions} partitions, {rows} rows fingerprinted")
+        except mysql.connector.Error as err:
+            logging.error(f"Freezing failed: {err}")
+        finally:
+            self.db.release(conn)
+
+    def unfreeze(self, academic_years):
+        """Drop `academic_years` from the frozen registry; the next backfill sweeps them in full."""
+        conn = self.connect()
+        if not conn:
+            return
+        try:
+            create_frozen_tables(conn)
+            unfrozen = unfreeze_years(conn, academic_years)
+            not_frozen = sorted(set(academic_years) - set(unfrozen))
+            if unfrozen:
+                logging.info(f"Unfrozen: {', '.join(unfrozen)}")
+            if not_frozen:
+                logging.info(f"Not frozen (nothing to do): {', '.join(not_frozen)}")
+        except mysql.connector.Error as err:
+            logging.error(f"Unfreezing failed: {err}")
+        finally:
+            self.db.release(conn)
+
+    def upsert_rows(self, conn, rows, change_counts=None, displaced=None, table=ASSESSMENT_TABLE):
+        """
+        Upserts rows produced by `transform_chunk` (into `table`, a copy of
+        the assessment table for the benchmark); returns the rowcount.
+        `displaced` collects the owners (Partition fields) of stored rows
+        the write moves to another partition. Raises if any of the rows
+        could not be written.
+        """
+        if not rows:
+            return 0
+
+        stamps = (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),) * 2
+        if self.key_mode == 'hashed':
+            rows = [row + (identity_key(row),) for row in rows]
+            key_column, write_columns = HASHED_KEY_COLUMN, HASHED_WRITE_COLUMNS
+        else:
+            key_column, write_columns = 'assessment_id_generated', WRITE_COLUMNS
+        update_clause = ', '.join(f"{col}=VALUES({col})" for col in write_columns
+                                  if col not in (key_column, 'created_at'))
+
+        try:
+            # One row per key (last wins, within the batch and across partitions in
+            # sweep order), and only new or changed ones, reach the database
+            rows, counts, owners = skip_unchanged_rows(conn, table, write_columns, rows, key_column,
+                                                       outranks=_later_in_sweep)
+            if change_counts is not None:
+                change_counts.update(counts)
+            if displaced is not None:
+                displaced.update(owners)
+            if not rows:
+                return 0
+
+            # Timestamps are appended as the statements are built, not to a copy of every row
+            values = (row + stamps for row in rows)
+            if self.write_mode == 'bulk':
+                return bulk_upsert(conn, table, write_columns, list(values), update_clause,
+                                   binary_columns=(HASHED_KEY_COLUMN,))
+            return write_chunks(conn, table, write_columns, values, update_clause,
+                                max_rows=self.write_chunk_rows, max_bytes=self.write_chunk_bytes,
+                                stats=self.write_stats, raise_on_failure=True)
+        except mysql.connector.Error as err:
+            logging.error(f"Upsert failed: {err}")
+            conn.rollback()
+            # Fails the partition: no watermark / checkpoint is recorded for it
+            raise
+
+    # ---------- API ----------
+    def assessment_url(self, assessment_category):
+        endpoint = 'getAssessmentMarks.htm' if assessment_category.lower() == 'standardized' else 'getSchoolExamMarks.htm'
+        return f"{self.api_url_base}/{endpoint}"
+
+    def partition_params(self, partition):
+        return {
+            'api-key': self.api_key,
+            'school_name': partition.school_name,
+            'academic_year': partition.academic_year,
+            'assessment_type': partition.assessment_type
+        }
+
+    def fetch_partition(self, partition, cache=None, run_metrics=None):
+        """
+        Spooled body of a partition (memory up to a few MB, then disk), decoded
+        incrementally by the pipeline. Closed years come from `cache` if fresh.
+        """
+        logging.info(f"Starting: {_describe(partition)} - {partition.assessment_category}")
+        url = self.assessment_url(partition.assessment_category)
+        params = self.partition_params(partition)
+        if cache is not None and partition.academic_year != current_academic_year():
+            cached = cache.open(url, params, ttl=self.cache_ttl)
+            if cached is not None:
+                return cached
+        try:
+            payload = self.api_client.fetch(url, params)
+        finally:
+            if run_metrics is not None:
+                run_metrics.request(partition, self.api_client.last_record())
+        if cache is not None:
+            try:
+                cache.store(url, params, payload)
+            except OSError as e:
+                logging.warning(f"Could not cache response for {_describe(partition)}: {e}")
+        return payload
+
+    # ---------- runs ----------
+    def _pipeline(self, on_done):
+        return Pipeline(
+            self.db, transform_partition_chunk, self.upsert_rows, on_done,
+            chunk_size=self.chunk_size,
+            transform_workers=self.transform_workers,
+            writer_workers=self.writer_workers,
+            queue_size=self.pipeline_queue_size,
+            landing=self.landing,
+            writer_key=_key_group
+        )
+
+    def _fetch(self, partitions, fetch_fn):
+        return fetch_partitions(
+            partitions,
+            fetch_fn,
+            lambda partition: self.assessment_url(partition.assessment_category),
+            max_workers=self.fetch_workers,
+            per_host_limit=self.per_host_limit,
+            min_interval=self.request_interval,
+            limiter=self.rate_limiter
+        )
+
+    def _log_error(self, partition, error):
+        logging.error(f"❌ Error: {_describe(partition)}")
+        logging.error(f"Exception: {str(error)}")
+        logging.error(''.join(traceback.format_exception(type(error), error, error.__traceback__)))
+
+    def _log_summaries(self, pipeline, change_counts, duplicates):
+        logging.info(f"Rows inserted: {change_counts['inserted']} | updated: {change_counts['changed']} | "
+                     f"unchanged (skipped): {change_counts['unchanged']} | duplicates (dropped): {change_counts['duplicates']}")
+        for (school_name, assessment_type), count in sorted(duplicates.items()):
+            logging.info(f"Duplicate rows dropped: {school_name} | {assessment_type}: {count}")
+        if not self.transform_workers:
+            # With worker processes the caches (and their counters) live in the workers
+            from edustems_etl.normalize import cache_stats
+            for name, info in cache_stats().items():
+                logging.info(f"Normalizer cache {name}: {info.hits} hits / {info.misses} misses")
+        self.api_client.log_summary()
+        if self.rate_limiter is not None:
+            self.rate_limiter.log_summary()
+        pipeline.log_summary()
+        self.write_stats.log_summary()
+        if self.rollups is not None:
+            stats = self.rollups.stats
+            logging.info(f"Rollups: {stats['slices']} partition slices refreshed in {stats['seconds']:.1f}s, "
+                         f"{stats['failed']} failed")
+        if self.landing is not None:
+            self.landing.log_summary()
+
+    def backfill(self, partitions, replay=False, resume=False):
+        """
+        Sweep `partitions`. With `replay=True` bodies come only from the
+        response cache (no network); uncached partitions are skipped.
+        Finished partitions go to the checkpoint journal; `resume` skips the
+        ones a previous run of the same mode completed. Partitions of frozen
+        years are skipped unless their stored rows drifted (plus a few
+        re-probes per run, see `FrozenYears`).
+        """
+        cache = ResponseCache(self.cache_dir, self.cache_max_bytes) if self.cache_enabled or replay else None
+        run_metrics = metrics_from_config(self.config, 'assessment_backfill')
+        journal = journal_from_config(self.config, 'assessment_replay' if replay else 'assessment_backfill')
+        if resume and journal is None:
+            logging.warning("--resume ignored: the checkpoint journal is disabled in the config")
+        if replay:
+            fetch_fn = lambda partition: cache.open(self.assessment_url(partition.assessment_category),
+                                                    self.partition_params(partition))
+        else:
+            fetch_fn = lambda partition: self.fetch_partition(partition, cache, run_metrics)
+
+        conn = self.connect()
+        if not conn:
+            return
+        if not self.prepare_tables(conn):
+            self.db.release(conn)
+            return
+        create_empty_partitions_table(conn)
+        latest_year = int(current_academic_year()[:4])
+        years = sorted({partition.academic_year for partition in partitions})
+        empty_index = EmptyPartitionIndex(latest_year, self.empty_reprobe_limit).load(conn, years)
+        frozen = frozen_years_from_config(self.config)
+        if frozen is not None:
+            try:
+                create_frozen_tables(conn)
+                frozen.load(conn, years).verify(conn)
+            except mysql.connector.Error as err:
+                # Without a verified registry every partition is swept, as before freezing
+                logging.error(f"Frozen-year check failed, sweeping frozen years too: {err}")
+                frozen = None
+        self.db.release(conn)
+
+        if journal is not None:
+            journal.open(resume)
+            skipped = (lambda partition: run_metrics.partition_skipped(partition, 'checkpoint')) if run_metrics else None
+            partitions = journal.pending(partitions, on_skip=skipped)
+
+        totals = Counter()
+        change_counts = Counter()
+        duplicates = Counter()  # (school, type) -> repeated rows dropped
+
+        def on_done(conn, partition, outcome):
+            if run_metrics is not None:
+                run_metrics.partition_done(partition, outcome)
+            if journal is not None:
+                journal.record(partition, outcome)
+            # conn is None only for failed outcomes, which return before it is used
+            if outcome.error:
+                self._log_error(partition, outcome.error)
+                return
+            empty_index.record(conn, partition, outcome.rows)
+            if frozen is not None:
+                try:
+                    frozen.record(conn, partition, outcome)
+                except mysql.connector.Error as err:
+                    # The rows are stored; a stale fingerprint only makes the next run reload the partition
+                    logging.error(f"Could not update the frozen fingerprint of {_describe(partition)}: {err}")
+            _count_changes(partition, outcome, change_counts, duplicates)
+            if not outcome.rows:
+                logging.info(f"No data: {_describe(partition)}")
+                return
+            totals['records'] += outcome.change_counts['inserted'] + outcome.change_counts['changed']
+            self.refresh_rollups(conn, partition, outcome)
+            logging.info(f"✅ Completed: {_describe(partition)} | {_describe_changes(outcome)}")
+
+        def loadable(fetched):
+            for partition, payload, error in fetched:
+                if not error and payload is None:
+                    logging.info(f"Not cached, skipped in replay: {_describe(partition)}")
+                    if run_metrics is not None:
+                        run_metrics.partition_skipped(partition, 'not_cached')
+                    continue
+                yield partition, payload, error
+
+        # Standardized and Non-Standardized partitions share one fetch pool; results
+        # are transformed on a process pool and written by pooled writer threads.
+        pipeline = self._pipeline(on_done)
+        if frozen is not None:
+            skipped = (lambda partition: run_metrics.partition_skipped(partition, 'frozen')) if run_metrics else None
+            partitions = frozen.plan(partitions, on_skip=skipped)
+        pipeline.run(loadable(self._fetch(empty_index.plan(partitions), fetch_fn)))
+
+        try:
+            with self.db.connection() as conn:
+                empty_index.flush(conn)
+        except mysql.connector.Error as e:
+            logging.error(f"Could not save the empty-partition index: {e}")
+        self.db.close_all()
+
+        logging.info(f"🎯 Total records inserted/updated: {totals['records']}")
+        self._log_summaries(pipeline, change_counts, duplicates)
+        stats = empty_index.stats
+        logging.info(
+            f"Empty-partition index: {stats['skipped']} requests saved, {stats['probed']} probed "
+            f"({stats['expired']} expired entries, {stats['newly_empty']} newly empty), "
+            f"{stats['reprobed']} re-probed ({stats['reprobe_found_data']} now have data)"
+        )
+        if frozen is not None:
+            frozen.log_summary()
+        if journal is not None:
+            try:
+                journal.write_report()
+            except OSError as e:
+                logging.error(f"Could not write the failed-partitions report: {e}")
+            journal.close()
+        if cache is not None:
+            logging.info(f"Response cache: {cache.hits} hits / {cache.misses} misses, {cache.stored_bytes} bytes stored")
+            if not replay:
+                removed_files, removed_bytes = cache.evict(ttl=self.cache_ttl)
+                if removed_files:
+                    logging.info(f"Response cache: evicted {removed_files} entries ({removed_bytes} bytes)")
+        if run_metrics is not None:
+            run_metrics.finish(
+                replay=replay,
+                http=self.api_client.summary(),
+                rate_control=None if self.rate_limiter is None else self.rate_limiter.summary(),
+                rollups=None if self.rollups is None else self.rollups.stats,
+                pipeline=pipeline.stats,
+                writer=self.write_stats.summary(),
+                empty_index=empty_index.stats,
+                frozen_years=None if frozen is None else dict(frozen.stats, years=sorted(frozen.years)),
+                checkpoint=None if journal is None else journal.stats,
+                response_cache=None if cache is None else {'hits': cache.hits, 'misses': cache.misses},
+            )
+            run_metrics.write_logged()
+
+    def incremental(self, partitions, full_resync=False):
+        """
+        Sync `partitions` against their watermarks in etl_sync_state: if the
+        raw payload fingerprint is unchanged since the last successful sync
+        the partition is skipped outright. Otherwise every row is transformed
+        and the row-hash check lets only new or edited rows through, which
+        also picks up late edits to old assessments. `full_resync` ignores
+        the watermarks.
+        """
+        conn = self.connect()
+        if not conn:
+            return
+        if not self.prepare_tables(conn):
+            self.db.release(conn)
+            return
+        create_sync_state_table(conn)
+        years = sorted({partition.academic_year for partition in partitions})
+        sync_states = {} if full_resync else load_sync_states(conn, years)
+        if full_resync:
+            logging.info("Full re-sync requested: ignoring sync watermarks.")
+        self.db.release(conn)
+
+        run_metrics = metrics_from_config(self.config, 'assessment_update')
+        totals = Counter()
+        change_counts = Counter()
+        duplicates = Counter()  # (school, type) -> repeated rows dropped
+        fingerprints = {}
+
+        def fetch_fn(partition):
+            payload = self.fetch_partition(partition, run_metrics=run_metrics)
+            # Fingerprinted on the fetch thread, compared with the watermark by the consumer
+            return payload, stream_digest(payload, hashlib.blake2b(digest_size=16))
+
+        def on_done(conn, partition, outcome):
+            if run_metrics is not None:
+                run_metrics.partition_done(partition, outcome)
+            if outcome.error:
+                self._log_error(partition, outcome.error)
+                fingerprints.pop(partition, None)
+                return
+            save_sync_state(conn, partition, outcome.max_date, fingerprints.pop(partition), outcome.rows)
+            _count_changes(partition, outcome, change_counts, duplicates)
+            if not outcome.rows:
+                logging.info(f"No data for: {_describe(partition)}")
+                return
+            totals['records'] += outcome.change_counts['inserted'] + outcome.change_counts['changed']
+            self.refresh_rollups(conn, partition, outcome)
+            logging.info(f"✅ Processed: {_describe(partition)} | {_describe_changes(outcome)}")
+
+        def changed_partitions(fetched):
+            """Drops partitions whose payload matches their sync watermark."""
+            for partition, result, error in fetched:
+                if error:
+                    yield partition, None, error
+                    continue
+                payload, fingerprint = result
+                state = sync_states.get(partition)
+                if state and state.payload_fingerprint == fingerprint:
+                    payload.close()
+                    with self.db.connection() as conn:
+                        touch_sync_state(conn, partition)
+                    totals['skipped_partitions'] += 1
+                    if run_metrics is not None:
+                        run_metrics.partition_skipped(partition, 'unchanged')
+                    logging.info(f"Unchanged since {state.last_success_at}: {_describe(partition)}")
+                    continue
+                fingerprints[partition] = fingerprint
+                yield partition, payload, None
+
+        # Changed partitions are split into chunks, transformed on a process pool and
+        # upserted by writer threads, each on its own pooled connection.
+        pipeline = self._pipeline(on_done)
+        pipeline.run(changed_partitions(self._fetch(partitions, fetch_fn)))
+        self.db.close_all()
+
+        logging.info(f"🎯 Total records inserted/updated: {totals['records']}")
+        logging.info(f"Partitions unchanged since last sync (skipped): {totals['skipped_partitions']}")
+        self._log_summaries(pipeline, change_counts, duplicates)
+        if run_metrics is not None:
+            run_metrics.finish(
+                full_resync=full_resync,
+                skipped_partitions=totals['skipped_partitions'],
+                http=self.api_client.summary(),
+                rate_control=None if self.rate_limiter is None else self.rate_limiter.summary(),
+                rollups=None if self.rollups is None else self.rollups.stats,
+                pipeline=pipeline.stats,
+                writer=self.write_stats.summary(),
+            )
+            run_metrics.write_logged()
+
+    def close(self):
+        self.db.close_all()
+        self.api_client.close()
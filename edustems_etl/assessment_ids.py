@@ -0,0 +1,139 @@
+"""Generation of `assessment_id_generated`, the upsert key of
+student_full_assessment_data.
+
+`generate_assessment_id` builds the key for one record dict.
+`generate_assessment_ids` produces the same keys for a whole partition
+DataFrame: each component (question words, subject/type prefixes, competency
+initials, YYMMDD date, student id) is derived once per distinct value and the
+parts are then concatenated column-wise with the same 64-character rules.
+"""
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from edustems_etl.normalize import map_distinct
+
+MAX_ID_LENGTH = 64
+
+_word = re.compile(r'\w+')
+
+
+def generate_assessment_id(row):
+    # Clean question name: first 2 words only, alphanumeric
+    question = row.get('question_name', '') or ''
+    words = re.findall(r'\w+', question)
+    short_question = "_".join(words[:2]) if words else ''
+
+    # Shorten subject and assessment type
+    subject = (row.get('subject_name', '') or '')[:3]
+    assessment_type = (row.get('assessment_type', '') or '')[:3]
+
+    # Competency: take first letter of each word
+    competency = row.get('competency_name', '') or ''
+    comp_letters = "".join(word[0] for word in competency.upper().split() if word.isalpha())
+
+    # Convert date to YYMMDD (if valid)
+    raw_date = str(row.get('assessment_date', ''))
+    date_str = ''
+    try:
+        date_obj = datetime.strptime(raw_date, "%Y-%m-%d")
+        date_str = date_obj.strftime("%y%m%d")  # e.g. 2023-10-25 → 231025
+    except ValueError:
+        date_str = raw_date[:6]  # fallback if date is not valid
+
+    # Build ID in required order
+    parts = [
+        str(row.get('student_id', '')),
+        assessment_type,
+        date_str,
+        subject,
+        comp_letters,
+        short_question
+    ]
+    assessment_id = "_".join(p.strip().replace(" ", "_").upper() for p in parts if p)
+
+    # Ensure max 64 chars: trim question first if too long
+    if len(assessment_id) > 64 and short_question:
+        # rebuild without question part
+        parts_no_q = parts[:-1]
+        assessment_id = "_".join(p.strip().replace(" ", "_").upper() for p in parts_no_q if p)
+    return assessment_id[:64]
+
+
+# ---------- Per-distinct-value components ----------
+def _short_question(value):
+    words = _word.findall(value or '')
+    return "_".join(words[:2]) if words else ''
+
+def _prefix3(value):
+    return (value or '')[:3]
+
+def _competency_letters(value):
+    return "".join(word[0] for word in (value or '').upper().split() if word.isalpha())
+
+def _date_code(value):
+    raw_date = str(value)
+    try:
+        return datetime.strptime(raw_date, "%Y-%m-%d").strftime("%y%m%d")
+    except ValueError:
+        return raw_date[:6]
+
+
+def record_values(df, col):
+    """
+    Column values exactly as `df.where(pd.notnull(df), None).to_dict('records')`
+    yields them: missing text cells (object or categorical) become None,
+    numeric columns keep NaN. None if the column is absent.
+    """
+    if col not in df.columns:
+        return None
+    series = df[col]
+    values = series.to_numpy(dtype=object, copy=True)
+    if series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+        values[pd.isna(values)] = None
+    return values
+
+
+def _part(df, col, func, size):
+    """(included, normalized) arrays for one key part; absent columns behave like `row.get(col, '')`."""
+    values = record_values(df, col)
+    raw = np.full(size, func(''), dtype=object) if values is None else map_distinct(values, func)
+    codes, uniques = pd.factorize(raw)
+    included = np.array([bool(u) for u in uniques] + [False], dtype=bool)[codes]
+    normalized = np.array([u.strip().replace(" ", "_").upper() for u in uniques] + [''], dtype=object)[codes]
+    return included, normalized
+
+
+def generate_assessment_ids(df):
+    """`generate_assessment_id` for every row of `df`, computed column-wise."""
+    size = len(df)
+    if not size:
+        return pd.Series([], index=df.index, dtype=object)
+
+    parts = [
+        _part(df, 'student_id', str, size),
+        _part(df, 'assessment_type', _prefix3, size),
+        _part(df, 'assessment_date', _date_code, size),
+        _part(df, 'subject_name', _prefix3, size),
+        _part(df, 'competency_name', _competency_letters, size),
+    ]
+    question_included, question = _part(df, 'question_name', _short_question, size)
+
+    without_question = np.full(size, '', dtype=object)
+    started = np.zeros(size, dtype=bool)
+    for included, normalized in parts:
+        piece = np.where(started, '_', '') + normalized
+        without_question = np.where(included, without_question + piece, without_question)
+        started |= included
+    with_question = np.where(
+        question_included,
+        without_question + np.where(started, '_', '') + question,
+        without_question
+    )
+
+    ids = pd.Series(with_question, index=df.index, dtype=object)
+    too_long = (ids.str.len() > MAX_ID_LENGTH).to_numpy() & question_included
+    ids[too_long] = without_question[too_long]
+    return ids.str[:MAX_ID_LENGTH]
@@ -0,0 +1,123 @@
+"""Bulk upsert through a session staging table.
+
+Rows are streamed into a TEMPORARY copy of the target table with
+`LOAD DATA LOCAL INFILE` (or, where local infile is disabled on either side,
+a multi-row INSERT), then merged into the target with one set-based
+`INSERT ... SELECT ... ON DUPLICATE KEY UPDATE`. The merge reads the staging
+rows in load order, so duplicate keys within a batch (the ETL collapses them
+beforehand, see change_detection) would resolve exactly as they do with
+`executemany` (last row wins), and `rowcount` keeps the same 1-per-insert /
+2-per-update meaning.
+"""
+import logging
+import os
+import tempfile
+
+import mysql.connector
+
+from edustems_etl.schema import is_null
+
+# Local infile disabled on the client (2068) or server (1148, 3948)
+LOCAL_INFILE_ERRORS = {1148, 2068, 3948}
+
+_local_infile_available = True
+
+
+def staging_table_name(table):
+    return f"{table}_stage"
+
+
+def _tsv_field(value):
+    # NaN/pandas.NA too: executemany stores NULL for them, LOAD DATA would store 0
+    if is_null(value):
+        return '\\N'
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()  # loaded through UNHEX (see binary_columns)
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    text = value if isinstance(value, str) else str(value)
+    return (text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+            .replace('\r', '\\r').replace('\0', '\\0'))
+
+
+def _ensure_staging_table(cursor, table, stage, columns):
+    # Column types are copied from the target (no indexes), plus a load-order sequence
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE IF NOT EXISTS {stage} (
+            stage_seq INT NOT NULL AUTO_INCREMENT PRIMARY KEY
+        ) ENGINE=InnoDB
+        SELECT {', '.join(columns)} FROM {table} LIMIT 0
+    """)
+
+
+def _load_local_infile(cursor, stage, columns, rows, binary_columns=()):
+    global _local_infile_available
+    fd, path = tempfile.mkstemp(prefix=f"{stage}_", suffix='.tsv')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as fh:
+            for row in rows:
+                fh.write('\t'.join(_tsv_field(v) for v in row))
+                fh.write('\n')
+        # Binary columns travel as hex through a user variable
+        targets = ', '.join(f"@{col}" if col in binary_columns else col for col in columns)
+        set_clause = ', '.join(f"{col} = UNHEX(@{col})" for col in columns if col in binary_columns)
+        cursor.execute(
+            f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE {stage}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+            LINES TERMINATED BY '\\n'
+            ({targets})
+            {f"SET {set_clause}" if set_clause else ''}
+            """,
+            (path,)
+        )
+        return True
+    except mysql.connector.Error as err:
+        if err.errno not in LOCAL_INFILE_ERRORS:
+            raise
+        _local_infile_available = False
+        logging.warning(f"LOAD DATA LOCAL INFILE unavailable ({err}); staging with multi-row INSERT instead.")
+        return False
+    finally:
+        os.remove(path)
+
+
+def _insert_rows(cursor, stage, columns, rows):
+    placeholders = ', '.join(['%s'] * len(columns))
+    cursor.executemany(
+        f"INSERT INTO {stage} ({', '.join(columns)}) VALUES ({placeholders})",
+        rows
+    )
+
+
+def bulk_upsert(conn, table, columns, rows, update_clause, use_local_infile=True, binary_columns=()):
+    """
+    Upsert `rows` (sequences ordered like `columns`) into `table` via the
+    session staging table and commit. `update_clause` is the body of the
+    ON DUPLICATE KEY UPDATE used by the row-wise path; `binary_columns`
+    hold bytes values. Returns the merge rowcount; errors propagate so the
+    caller can roll back as before.
+    """
+    if not rows:
+        return 0
+
+    stage = staging_table_name(table)
+    column_list = ', '.join(columns)
+    with conn.cursor() as cursor:
+        _ensure_staging_table(cursor, table, stage, columns)
+        cursor.execute(f"DELETE FROM {stage}")
+
+        loaded = use_local_infile and _local_infile_available and _load_local_infile(cursor, stage, columns, rows, binary_columns)
+        if not loaded:
+            _insert_rows(cursor, stage, columns, rows)
+
+        cursor.execute(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {stage} ORDER BY stage_seq
+            ON DUPLICATE KEY UPDATE {update_clause}
+        """)
+        affected = cursor.rowcount
+        cursor.execute(f"DELETE FROM {stage}")
+    conn.commit()
+    return affected
@@ -0,0 +1,158 @@
+"""Checkpoint journal of a backfill sweep.
+
+Every partition the pipeline finishes is appended to
+
+    <directory>/<job>.jsonl          one JSON line per finished partition
+
+as {"partition": {...}, "status": "done" | "failed", ...} and fsynced, so the
+journal survives the process being killed at any point. A run with
+`--resume` reads it back: partitions whose latest entry is "done" are
+skipped, failed and never-reached ones run again. A run without `--resume`
+starts a fresh journal (the previous one is kept as `<job>.jsonl.prev`).
+
+At the end of the run the partitions whose latest entry is "failed" are
+written to
+
+    <directory>/<job>_failed.json    replaced each run
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from edustems_etl.scheduler import Partition
+
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class CheckpointJournal:
+    """Append-only journal of finished partitions (thread-safe)."""
+
+    def __init__(self, directory, job):
+        self.directory = directory
+        self.job = job
+        self.path = os.path.join(directory, f"{job}.jsonl")
+        self.report_path = os.path.join(directory, f"{job}_failed.json")
+        self.entries = {}  # partition -> latest entry
+        self.stats = {'done': 0, 'failed': 0, 'resumed_skipped': 0}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self, resume=False):
+        """Start the journal; with `resume` the previous entries are loaded and kept."""
+        os.makedirs(self.directory, exist_ok=True)
+        if resume:
+            self.entries = self._load()
+            done = sum(1 for entry in self.entries.values() if entry['status'] == STATUS_DONE)
+            logging.info(f"Checkpoint: resuming from {self.path} ({done} done, {len(self.entries) - done} failed)")
+        elif os.path.exists(self.path):
+            os.replace(self.path, self.path + '.prev')
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if resume and not _ends_with_newline(self.path):
+            # Terminate a line torn by a crash, or the next entry would be glued to it
+            self._file.write('\n')
+        return self
+
+    def _load(self):
+        entries = {}
+        if not os.path.exists(self.path):
+            logging.warning(f"Checkpoint: no journal at {self.path}, nothing to resume")
+            return entries
+        with open(self.path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                    partition = Partition(**entry['partition'])
+                except (ValueError, KeyError, TypeError):
+                    # A line cut short by a crash; that partition simply runs again
+                    logging.warning(f"Checkpoint: ignoring unreadable line {number} of {self.path}")
+                    continue
+                entries[partition] = entry
+        return entries
+
+    def pending(self, partitions, on_skip=None):
+        """`partitions` without the ones already done; those are passed to `on_skip`."""
+        remaining = []
+        for partition in partitions:
+            entry = self.entries.get(partition)
+            if entry is not None and entry['status'] == STATUS_DONE:
+                self.stats['resumed_skipped'] += 1
+                if on_skip is not None:
+                    on_skip(partition)
+                continue
+            remaining.append(partition)
+        if self.stats['resumed_skipped']:
+            logging.info(f"Checkpoint: {self.stats['resumed_skipped']} partitions already done, "
+                         f"{len(remaining)} left to run")
+        return remaining
+
+    def record(self, partition, outcome):
+        """Journal a finished partition from its pipeline outcome."""
+        entry = {
+            'partition': partition._asdict(),
+            'status': STATUS_FAILED if outcome.error else STATUS_DONE,
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'rows': outcome.rows,
+            'affected': outcome.affected,
+        }
+        if outcome.error:
+            entry['error'] = f"{type(outcome.error).__name__}: {outcome.error}"
+        line = json.dumps(entry, default=str) + '\n'
+        with self._lock:
+            self.entries[partition] = entry
+            self.stats[entry['status']] += 1
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def failed(self):
+        """Latest entries of the partitions still failing, this run or a resumed one."""
+        return [entry for entry in self.entries.values() if entry['status'] == STATUS_FAILED]
+
+    def write_report(self):
+        """Write the failed-partitions report and log it; returns the number of failed partitions."""
+        failed = self.failed()
+        report = {
+            'job': self.job,
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'journal': self.path,
+            'failed': failed,
+        }
+        tmp = f"{self.report_path}.tmp-{os.getpid()}"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+        os.replace(tmp, self.report_path)
+
+        logging.info(f"Checkpoint: {self.stats['done']} partitions done, {self.stats['failed']} failed this run, "
+                     f"{self.stats['resumed_skipped']} skipped as already done")
+        if failed:
+            logging.warning(f"Failed partitions ({len(failed)}), listed in {self.report_path}; "
+                            f"rerun with --resume to retry them:")
+            for entry in failed:
+                p = entry['partition']
+                logging.warning(f"  {p['assessment_category']} | {p['academic_year']} | {p['school_name']} | "
+                                f"{p['assessment_type']}: {entry.get('error')}")
+        return len(failed)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def journal_from_config(config, job):
+    """CheckpointJournal for `job` from the optional [checkpoint] section, or None when disabled."""
+    if not config.getboolean('checkpoint', 'enabled', fallback=True):
+        return None
+    return CheckpointJournal(config.get('checkpoint', 'directory', fallback='checkpoints'), job)
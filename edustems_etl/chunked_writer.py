@@ -0,0 +1,161 @@
+"""Chunked multi-row upserts.
+
+Rows are grouped into chunks bounded both by row count and by the estimated
+size of the statement, so a chunk never approaches `max_allowed_packet` and
+never holds row locks for long. Each chunk is sent as one multi-row
+`INSERT ... VALUES (...), (...) ON DUPLICATE KEY UPDATE` and committed on its
+own. Deadlocks (1213) and lock wait timeouts (1205) roll the chunk back and
+retry it after a short backoff; any other error loses only that chunk, and
+the remaining chunks are still written. With `raise_on_failure` a
+`ChunkWriteError` is raised after the last chunk if any of them was lost,
+so the caller can treat the batch as failed.
+"""
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+
+import mysql.connector
+
+DEFAULT_MAX_ROWS = 1000
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+RETRYABLE_ERRORS = frozenset({1205, 1213})
+MAX_ATTEMPTS = 4
+RETRY_DELAY = 0.5
+
+ChunkResult = namedtuple('ChunkResult', ['rows', 'bytes', 'affected', 'attempts', 'elapsed', 'ok'])
+
+
+class ChunkWriteError(Exception):
+    """Some chunks of a `write_chunks` call were lost (the others were committed)."""
+
+    def __init__(self, table, failed_chunks, failed_rows, last_error):
+        super().__init__(f"{failed_chunks} chunks ({failed_rows} rows) into {table} failed; last error: {last_error}")
+        self.failed_chunks = failed_chunks
+        self.failed_rows = failed_rows
+
+
+def estimate_row_bytes(row):
+    """Approximate size of a row rendered as a SQL VALUES tuple."""
+    size = 2
+    for value in row:
+        if value is None:
+            size += 5
+        elif isinstance(value, str):
+            size += len(value.encode('utf-8')) + 3
+        else:
+            size += len(str(value)) + 1
+    return size
+
+
+def iter_sized_chunks(rows, max_rows=DEFAULT_MAX_ROWS, max_bytes=DEFAULT_MAX_BYTES):
+    """Yield (chunk, estimated_bytes); a single oversized row still forms its own chunk."""
+    chunk, chunk_bytes = [], 0
+    for row in rows:
+        row_bytes = estimate_row_bytes(row)
+        if chunk and (len(chunk) >= max_rows or chunk_bytes + row_bytes > max_bytes):
+            yield chunk, chunk_bytes
+            chunk, chunk_bytes = [], 0
+        chunk.append(row)
+        chunk_bytes += row_bytes
+    if chunk:
+        yield chunk, chunk_bytes
+
+
+class WriteStats:
+    """Per-chunk results accumulated over a run (thread-safe)."""
+
+    def __init__(self):
+        self.chunks = []
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        with self._lock:
+            self.chunks.append(result)
+
+    def summary(self):
+        with self._lock:
+            chunks = list(self.chunks)
+        written = [c for c in chunks if c.ok]
+        elapsed = sum(c.elapsed for c in written)
+        rows = sum(c.rows for c in written)
+        return {
+            'chunks': len(chunks),
+            'failed_chunks': len(chunks) - len(written),
+            'failed_rows': sum(c.rows for c in chunks if not c.ok),
+            'rows': rows,
+            'bytes': sum(c.bytes for c in written),
+            'retries': sum(c.attempts - 1 for c in chunks),
+            'elapsed': elapsed,
+            'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        }
+
+    def log_summary(self):
+        s = self.summary()
+        logging.info(
+            f"Writer: {s['rows']} rows in {s['chunks']} chunks ({s['bytes'] / 1048576:.1f} MB), "
+            f"{s['rows_per_sec']:.0f} rows/s, {s['retries']} retries, "
+            f"{s['failed_chunks']} failed chunks ({s['failed_rows']} rows)"
+        )
+
+
+def _write_chunk(conn, prefix, suffix, row_placeholder, chunk):
+    query = prefix + ', '.join([row_placeholder] * len(chunk)) + suffix
+    params = [value for row in chunk for value in row]
+    with conn.cursor() as cursor:
+        cursor.execute(query, params)
+        affected = cursor.rowcount
+    conn.commit()
+    return affected
+
+
+def write_chunks(conn, table, columns, rows, update_clause, max_rows=DEFAULT_MAX_ROWS,
+                 max_bytes=DEFAULT_MAX_BYTES, stats=None, raise_on_failure=False):
+    """
+    Upsert `rows` (sequences ordered like `columns`) into `table` chunk by
+    chunk, committing each. Returns the summed rowcount of the chunks that
+    were written; failed chunks are logged and recorded in `stats` (and
+    raised as one `ChunkWriteError` at the end with `raise_on_failure`).
+    """
+    row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    suffix = f" ON DUPLICATE KEY UPDATE {update_clause}"
+
+    total_affected = 0
+    failed_chunks, failed_rows, last_error = 0, 0, None
+    for chunk, chunk_bytes in iter_sized_chunks(rows, max_rows, max_bytes):
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                affected = _write_chunk(conn, prefix, suffix, row_placeholder, chunk)
+                ok = True
+                break
+            except mysql.connector.Error as err:
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    pass  # connection lost; the pool replaces it on release
+                if err.errno in RETRYABLE_ERRORS and attempt < MAX_ATTEMPTS:
+                    delay = random.uniform(0, RETRY_DELAY * 2 ** attempt)
+                    logging.warning(f"Chunk of {len(chunk)} rows hit {err.errno}; retry {attempt}/{MAX_ATTEMPTS - 1} in {delay:.2f}s")
+                    time.sleep(delay)
+                    continue
+                logging.error(f"Chunk of {len(chunk)} rows into {table} failed: {err}")
+                affected, ok = 0, False
+                failed_chunks, failed_rows, last_error = failed_chunks + 1, failed_rows + len(chunk), err
+                break
+
+        elapsed = time.monotonic() - started
+        result = ChunkResult(len(chunk), chunk_bytes, affected, attempt, elapsed, ok)
+        if stats is not None:
+            stats.add(result)
+        if ok:
+            total_affected += affected
+            logging.debug(f"Chunk: {len(chunk)} rows, {chunk_bytes} bytes in {elapsed:.3f}s "
+                          f"({len(chunk) / elapsed if elapsed else 0:.0f} rows/s)")
+    if failed_chunks and raise_on_failure:
+        raise ChunkWriteError(table, failed_chunks, failed_rows, last_error)
+    return total_affected
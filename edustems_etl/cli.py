@@ -0,0 +1,169 @@
+"""Command line entry point of the assessment ETL.
+
+    python -m edustems_etl backfill [--start-year 2023 | --years 2024-2025 ...] [--resume]
+    python -m edustems_etl incremental [--full-resync]
+    python -m edustems_etl replay --years 2023-2024
+    python -m edustems_etl rollups [--years 2024-2025 ...]
+    python -m edustems_etl freeze --years 2023-2024 ...
+    python -m edustems_etl unfreeze --years 2023-2024 ...
+
+backfill, incremental and replay take --schools, --years, --types and
+--categories to narrow the sweep, e.g. a cron targeting one school's unit tests:
+
+    python -m edustems_etl incremental --schools SMPS --types "UNIT 1" "UNIT 2"
+
+Only argparse is imported up front; the engine (requests, mysql-connector)
+loads after the arguments are parsed and pandas only where transforms run.
+"""
+import argparse
+import logging
+import os
+import sys
+
+MODES = ('backfill', 'incremental', 'replay', 'rollups', 'freeze', 'unfreeze')
+DEFAULT_LOG_FILES = {
+    'backfill': 'assessment_etl_student.log',
+    'replay': 'assessment_etl_student.log',
+    'incremental': 'assessment_etl_update.log',
+    'rollups': 'assessment_rollups.log',
+    'freeze': 'assessment_etl_student.log',
+    'unfreeze': 'assessment_etl_student.log',
+}
+DEFAULT_START_YEAR = 2023
+
+
+def academic_year_arg(value):
+    """'2024' or '2024-2025' → '2024-2025'."""
+    start = value.split('-', 1)[0]
+    if not start.isdigit() or len(start) != 4:
+        raise argparse.ArgumentTypeError(f"not an academic year: {value!r} (expected e.g. 2024-2025)")
+    return f"{start}-{int(start) + 1}"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m edustems_etl', description="Student assessment marks ETL.")
+    modes = parser.add_subparsers(dest='mode', required=True, metavar='MODE')
+
+    base = argparse.ArgumentParser(add_help=False)
+    base.add_argument('--config', default='config.ini', help="config file (default: ./config.ini)")
+    base.add_argument('--log-file', help="log file (default: next to the config file)")
+
+    common = argparse.ArgumentParser(add_help=False, parents=[base])
+    common.add_argument('--schools', nargs='+', metavar='SCHOOL', help="only these schools")
+    common.add_argument('--years', nargs='+', type=academic_year_arg, metavar='YEAR',
+                        help="only these academic years (2024 or 2024-2025)")
+    common.add_argument('--types', nargs='+', metavar='TYPE', help="only these assessment types")
+    common.add_argument('--categories', nargs='+', choices=('Standardized', 'Non-Standardized'),
+                        help="only these assessment categories")
+
+    backfill = modes.add_parser('backfill', parents=[common], help="sweep academic years partition by partition")
+    backfill.add_argument('--start-year', type=int, default=DEFAULT_START_YEAR,
+                          help=f"first academic year when --years is not given (default: {DEFAULT_START_YEAR})")
+    backfill.add_argument('--resume', action='store_true',
+                          help="skip partitions the checkpoint journal records as done; rerun failed and unfinished ones")
+
+    incremental = modes.add_parser('incremental', parents=[common],
+                                   help="sync the current academic year against the stored watermarks")
+    incremental.add_argument('--full-resync', action='store_true',
+                             help="ignore the stored sync watermarks and reprocess every partition")
+
+    replay = modes.add_parser('replay', parents=[common],
+                              help="run the backfill from cached API responses only, without network access")
+    replay.add_argument('--start-year', type=int, default=DEFAULT_START_YEAR,
+                        help=f"first academic year when --years is not given (default: {DEFAULT_START_YEAR})")
+    replay.add_argument('--resume', action='store_true',
+                        help="skip partitions the replay checkpoint journal records as done")
+
+    rollups = modes.add_parser('rollups', parents=[base],
+                               help="rebuild the dashboard rollup tables from student_full_assessment_data")
+    rollups.add_argument('--years', nargs='+', type=academic_year_arg, metavar='YEAR',
+                         help="only these academic years (default: every year in the table)")
+
+    freeze = modes.add_parser('freeze', parents=[base],
+                              help="mark closed academic years final: backfills skip them unless their rows drift")
+    freeze.add_argument('--years', nargs='+', type=academic_year_arg, metavar='YEAR', required=True,
+                        help="academic years to freeze (their stored partitions are fingerprinted now)")
+    unfreeze = modes.add_parser('unfreeze', parents=[base],
+                                help="drop academic years from the frozen registry so backfills sweep them again")
+    unfreeze.add_argument('--years', nargs='+', type=academic_year_arg, metavar='YEAR', required=True,
+                          help="academic years to unfreeze")
+    return parser
+
+
+def setup_logging(log_file):
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    console = logging.StreamHandler()
+    console.setLevel(logging.INFO)
+    console.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logging.getLogger('').addHandler(console)
+
+
+def select_partitions(args, etl_module):
+    """Partitions of the run, narrowed by the selection arguments."""
+    categories = args.categories or list(etl_module.CATEGORIES)
+    schools = args.schools or etl_module.SCHOOL_NAMES
+    unknown = sorted(set(schools) - set(etl_module.SCHOOL_NAMES))
+    if unknown:
+        logging.warning(f"Schools not in the known list (requested anyway): {', '.join(unknown)}")
+
+    if args.years:
+        years = args.years
+    elif args.mode == 'incremental':
+        years = [etl_module.current_academic_year()]
+    else:
+        years = etl_module.academic_years(args.start_year)
+
+    if args.types:
+        types_by_category = {category: args.types for category in categories}
+    elif args.mode == 'incremental':
+        types_by_category = etl_module.TYPES_BY_CATEGORY
+    else:
+        types_by_category = {category: etl_module.ASSESSMENT_TYPES for category in categories}
+    return etl_module.build_partitions(categories, years, schools, types_by_category)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    config_path = os.path.abspath(args.config)
+    setup_logging(args.log_file or os.path.join(os.path.dirname(config_path), DEFAULT_LOG_FILES[args.mode]))
+    if not os.path.exists(config_path):
+        logging.error(f"Config file not found at: {config_path}")
+        sys.exit(1)
+
+    import configparser
+    import warnings
+
+    import urllib3
+
+    from edustems_etl import assessment_etl
+
+    # Disable SSL verification warnings
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    warnings.filterwarnings("ignore", category=UserWarning, module="pandas")
+
+    config = configparser.ConfigParser()
+    config.read(config_path)
+
+    etl = assessment_etl.AssessmentEtl(config)
+    if args.mode in ('rollups', 'freeze', 'unfreeze'):
+        run = {'rollups': etl.rebuild_rollups, 'freeze': etl.freeze, 'unfreeze': etl.unfreeze}[args.mode]
+        try:
+            run(args.years)
+        finally:
+            etl.close()
+        return
+
+    partitions = select_partitions(args, assessment_etl)
+    logging.info(f"{args.mode}: {len(partitions)} partitions selected")
+    try:
+        if args.mode == 'incremental':
+            etl.incremental(partitions, full_resync=args.full_resync)
+        else:
+            etl.backfill(partitions, replay=(args.mode == 'replay'), resume=args.resume)
+    finally:
+        etl.close()
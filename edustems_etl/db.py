@@ -0,0 +1,174 @@
+"""MySQL connection management shared by the ETL scripts.
+
+`ConnectionManager` opens connections with the first authentication setup
+that works against the server and remembers it, in memory and in a small
+state file keyed by user@host:port, so later connections and later runs go
+straight to it instead of walking the fallback list. Connections are handed
+out per caller (one per worker thread) and returned to an idle pool; a
+connection that sat idle is pinged (and transparently reconnected) before it
+is reused, so a dropped socket costs one reconnect instead of every
+remaining partition.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+
+# Tried in order until one connects; the one that worked is tried first next time
+DEFAULT_AUTH_METHODS = (
+    {},
+    {'use_pure': True},
+    {'auth_plugin': 'caching_sha2_password'},
+    {'auth_plugin': 'mysql_native_password'},
+)
+DEFAULT_AUTH_STATE = os.path.join(os.path.expanduser('~'), '.cache', 'edustems_etl', 'mysql_auth.json')
+HEALTH_CHECK_AFTER = 30.0
+PING_ATTEMPTS = 3
+PING_DELAY = 2
+
+
+class ConnectionManager:
+    """
+    Hands out healthy connections to `db_config`; keeps at most `pool_size`
+    idle ones for reuse. Extra keyword arguments go to every connect call.
+    """
+
+    def __init__(self, db_config, pool_size=4, auth_methods=DEFAULT_AUTH_METHODS,
+                 state_path=DEFAULT_AUTH_STATE, **connect_args):
+        self.db_config = dict(db_config, **connect_args)
+        self.pool_size = pool_size
+        self.auth_methods = [dict(method) for method in auth_methods]
+        self.state_path = state_path
+        self.stats = {'opened': 0, 'reused': 0, 'reconnected': 0, 'discarded': 0}
+        self._auth = None
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @property
+    def _state_key(self):
+        return f"{self.db_config.get('user')}@{self.db_config.get('host')}:{self.db_config.get('port')}"
+
+    def _load_auth(self):
+        if self._auth is not None or not self.state_path:
+            return self._auth
+        try:
+            with open(self.state_path) as fh:
+                self._auth = json.load(fh).get(self._state_key)
+        except (OSError, ValueError):
+            pass
+        return self._auth
+
+    def _save_auth(self, method):
+        self._auth = method
+        if not self.state_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            try:
+                with open(self.state_path) as fh:
+                    state = json.load(fh)
+            except (OSError, ValueError):
+                state = {}
+            state[self._state_key] = method
+            tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as fh:
+                json.dump(state, fh)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logging.debug(f"Could not persist MySQL auth method: {e}")
+
+    def connect(self):
+        """A new connection, trying the remembered auth method first."""
+        remembered = self._load_auth()
+        methods = list(self.auth_methods)
+        if remembered is not None:
+            methods = [remembered] + [m for m in methods if m != remembered]
+
+        last_error = None
+        for method in methods:
+            try:
+                conn = mysql.connector.connect(**self.db_config, **method)
+            except mysql.connector.Error as e:
+                last_error = e
+                continue
+            if conn.is_connected():
+                if method != remembered:
+                    logging.info(f"MySQL auth method that worked: {method or 'default'}")
+                    self._save_auth(method)
+                with self._lock:
+                    self.stats['opened'] += 1
+                conn._etl_checked_at = time.monotonic()
+                return conn
+        raise last_error or mysql.connector.InterfaceError("MySQL connection failed")
+
+    def _healthy(self, conn):
+        if time.monotonic() - getattr(conn, '_etl_checked_at', 0) < HEALTH_CHECK_AFTER:
+            return True
+        try:
+            was_connected = conn.is_connected()
+            conn.ping(reconnect=True, attempts=PING_ATTEMPTS, delay=PING_DELAY)
+        except mysql.connector.Error as e:
+            logging.warning(f"Discarding dead MySQL connection: {e}")
+            return False
+        if not was_connected:
+            with self._lock:
+                self.stats['reconnected'] += 1
+        conn._etl_checked_at = time.monotonic()
+        return True
+
+    def get(self):
+        """A healthy connection owned by the caller until `release`d (or closed)."""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self.connect()
+            if self._healthy(conn):
+                with self._lock:
+                    self.stats['reused'] += 1
+                return conn
+            self._discard(conn)
+
+    def release(self, conn):
+        """Return a connection for reuse; broken or surplus ones are closed."""
+        try:
+            usable = conn.is_connected()
+            if usable:
+                conn.rollback()  # never hand uncommitted work to the next user
+        except mysql.connector.Error:
+            usable = False
+        with self._lock:
+            if usable and len(self._idle) < self.pool_size:
+                conn._etl_checked_at = time.monotonic()
+                self._idle.append(conn)
+                return
+        self._discard(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self.stats['discarded'] += 1
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        conn = self.get()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
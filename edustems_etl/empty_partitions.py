@@ -0,0 +1,154 @@
+"""Index of partitions the API answered with no rows.
+
+Most school × assessment_type × year combinations never have data, yet a
+sweep pays a full request for each of them. `etl_empty_partitions` remembers
+which partitions came back empty and when they were last checked, and
+`EmptyPartitionIndex.plan` drops them from the sweep until their entry
+expires. Expiry depends on the age of the academic year: the current year
+can still gain assessments any day, closed years almost never.
+
+Every run also re-probes a few of the longest-unchecked skipped partitions,
+queued after all regular work so they never delay it.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from edustems_etl.scheduler import Partition
+from edustems_etl.schema import create_partition_table
+
+EMPTY_PARTITIONS_TABLE = 'etl_empty_partitions'
+
+# Days an empty result stays trusted, by how many years ago the academic year started
+EMPTY_TTL_DAYS = {0: 1, 1: 14}
+CLOSED_YEAR_TTL_DAYS = 90
+DEFAULT_REPROBE_LIMIT = 25
+FLUSH_SIZE = 200
+
+
+def empty_ttl(academic_year, latest_year):
+    """How long an empty result for `academic_year` ('2023-2024') stays valid."""
+    age = latest_year - int(academic_year[:4])
+    return timedelta(days=EMPTY_TTL_DAYS.get(age, CLOSED_YEAR_TTL_DAYS))
+
+
+def create_empty_partitions_table(conn):
+    with conn.cursor() as cursor:
+        create_partition_table(cursor, EMPTY_PARTITIONS_TABLE,
+                               ['first_empty_at DATETIME NOT NULL', 'last_checked_at DATETIME NOT NULL'])
+    conn.commit()
+
+
+class EmptyPartitionIndex:
+    """
+    Known-empty partitions of a sweep, loaded once and updated as results
+    arrive. `plan` is still reading entries when the first results are
+    recorded (from the writer threads), so both go through `_lock`.
+    """
+
+    def __init__(self, latest_year, reprobe_limit=DEFAULT_REPROBE_LIMIT):
+        self.latest_year = latest_year
+        self.reprobe_limit = reprobe_limit
+        self.entries = {}
+        self.stats = {'skipped': 0, 'probed': 0, 'reprobed': 0, 'reprobe_found_data': 0,
+                      'newly_empty': 0, 'expired': 0}
+        self._reprobes = set()
+        self._pending_empty = []
+        self._pending_found = []
+        self._lock = threading.Lock()
+
+    def load(self, conn, academic_years):
+        academic_years = list(academic_years)
+        if not academic_years:
+            return self
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT assessment_category, academic_year, school_name, assessment_type, last_checked_at
+                FROM {EMPTY_PARTITIONS_TABLE}
+                WHERE academic_year IN ({', '.join(['%s'] * len(academic_years))})
+                """,
+                academic_years
+            )
+            self.entries = {Partition(*row[:4]): row[4] for row in cursor.fetchall()}
+        return self
+
+    def is_fresh(self, partition, now=None):
+        """Whether `partition` is known to be empty and its entry has not expired. Call with `_lock` held."""
+        checked = self.entries.get(partition)
+        if checked is None:
+            return False
+        return (now or datetime.now()) - checked < empty_ttl(partition.academic_year, self.latest_year)
+
+    def plan(self, partitions):
+        """
+        Yield the partitions worth requesting: everything not known to be
+        empty, then up to `reprobe_limit` skipped ones, stalest first.
+        """
+        now = datetime.now()
+        skipped = []
+        for partition in partitions:
+            with self._lock:
+                if self.is_fresh(partition, now):
+                    skipped.append((self.entries[partition], partition))
+                    continue
+                if partition in self.entries:
+                    self.stats['expired'] += 1
+                self.stats['probed'] += 1
+            yield partition
+
+        # Sorted by the check time seen when skipping: `record` may have replaced the entry since
+        skipped.sort(key=lambda item: item[0])
+        reprobes = [partition for _, partition in skipped[:self.reprobe_limit]]
+        with self._lock:
+            self.stats['skipped'] += len(skipped) - len(reprobes)
+            self._reprobes.update(reprobes)
+            self.stats['reprobed'] += len(reprobes)
+        yield from reprobes
+
+    def record(self, conn, partition, rows):
+        """Note the outcome of a successfully fetched partition."""
+        with self._lock:
+            if rows:
+                if partition in self.entries:
+                    if partition in self._reprobes:
+                        self.stats['reprobe_found_data'] += 1
+                    del self.entries[partition]
+                    self._pending_found.append(partition)
+            else:
+                if partition not in self.entries:
+                    self.stats['newly_empty'] += 1
+                self.entries[partition] = datetime.now()
+                self._pending_empty.append(partition)
+        if len(self._pending_empty) + len(self._pending_found) >= FLUSH_SIZE:
+            self.flush(conn)
+
+    def flush(self, conn):
+        if not (self._pending_empty or self._pending_found):
+            return
+        with conn.cursor() as cursor:
+            if self._pending_empty:
+                cursor.executemany(
+                    f"""
+                    INSERT INTO {EMPTY_PARTITIONS_TABLE} (
+                        school_name, academic_year, assessment_type, assessment_category,
+                        first_empty_at, last_checked_at
+                    ) VALUES (%s, %s, %s, %s, NOW(), NOW())
+                    ON DUPLICATE KEY UPDATE last_checked_at = VALUES(last_checked_at)
+                    """,
+                    [_key(p) for p in self._pending_empty]
+                )
+            if self._pending_found:
+                cursor.executemany(
+                    f"""
+                    DELETE FROM {EMPTY_PARTITIONS_TABLE}
+                    WHERE school_name = %s AND academic_year = %s AND assessment_type = %s AND assessment_category = %s
+                    """,
+                    [_key(p) for p in self._pending_found]
+                )
+        conn.commit()
+        self._pending_empty = []
+        self._pending_found = []
+
+
+def _key(partition):
+    return (partition.school_name, partition.academic_year, partition.assessment_type, partition.assessment_category)
@@ -0,0 +1,330 @@
+"""Registry of finalized (frozen) academic years.
+
+Closed academic years almost never change, yet a backfill from --start-year
+re-fetches and re-upserts every one of them on every run. `freeze_years`
+records a year as final, together with a fingerprint of every partition it
+has rows for:
+
+    etl_frozen_years        academic_year, frozen_at
+    etl_frozen_partitions   per partition: row_count and content_hash, the
+                            XOR of the first 64 bits of its rows' row_hash
+                            (order-independent), frozen_at, verified_at
+
+A backfill skips the partitions of frozen years, after a verification probe:
+one grouped query recomputes the fingerprints of the frozen years from the
+fact table, without any API request. A partition whose stored rows no longer
+match (rows deleted, edited by hand, written by another run) has drifted and
+is fetched and loaded like any other, then re-fingerprinted. A partition
+with rows that were not there when the year was frozen counts as drifted too.
+
+The probe cannot see edits made at the source, so every run also re-fetches
+up to `reprobe_limit` frozen partitions, least recently verified first, and
+queues them after all regular work. Change detection keeps those writes
+cheap. If one turns out to have new or changed rows, a warning is logged and
+its fingerprint is updated.
+
+`unfreeze_years` drops years from the registry; the next backfill sweeps
+them in full. The current academic year cannot be frozen.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+from edustems_etl.scheduler import Partition
+from edustems_etl.schema import ASSESSMENT_TABLE, create_partition_table
+
+FROZEN_YEARS_TABLE = 'etl_frozen_years'
+FROZEN_PARTITIONS_TABLE = 'etl_frozen_partitions'
+DEFAULT_REPROBE_LIMIT = 10
+
+# Row count and the XOR of the rows' row_hash prefixes (NULL hashes are ignored)
+_fingerprint_columns = """
+    COUNT(*), BIT_XOR(CAST(CONV(LEFT(row_hash, 16), 16, 10) AS UNSIGNED))
+"""
+
+
+def create_frozen_tables(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FROZEN_YEARS_TABLE} (
+            academic_year VARCHAR(20) NOT NULL,
+            frozen_at DATETIME NOT NULL,
+            PRIMARY KEY (academic_year)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
+        """)
+        create_partition_table(cursor, FROZEN_PARTITIONS_TABLE, [
+            'row_count INT NOT NULL', 'content_hash BIGINT UNSIGNED NOT NULL',
+            'frozen_at DATETIME NOT NULL', 'verified_at DATETIME NOT NULL'
+        ])
+    conn.commit()
+
+
+def year_fingerprints(conn, academic_years):
+    """{Partition: (row_count, content_hash)} of the rows stored for `academic_years`."""
+    academic_years = list(academic_years)
+    if not academic_years:
+        return {}
+    with conn.cursor() as cursor:
+        # Types differ only by case ('UNIT 1' / 'Unit 1') and the fact table's
+        # collation would merge them: group type and category binary
+        cursor.execute(
+            f"""
+            SELECT assessment_category COLLATE utf8mb4_bin, academic_year, school_name,
+                   assessment_type COLLATE utf8mb4_bin, {_fingerprint_columns}
+            FROM {ASSESSMENT_TABLE}
+            WHERE academic_year IN ({', '.join(['%s'] * len(academic_years))})
+              AND assessment_category IS NOT NULL AND school_name IS NOT NULL AND assessment_type IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+            """,
+            academic_years
+        )
+        return {Partition(*row[:4]): (row[4], row[5] or 0) for row in cursor.fetchall()}
+
+
+def partition_fingerprint(conn, partition):
+    """(row_count, content_hash) of the rows stored for one partition."""
+    with conn.cursor() as cursor:
+        # The plain comparisons use idx_full_dashboard_filters, the binary ones make them exact
+        cursor.execute(
+            f"""
+            SELECT {_fingerprint_columns}
+            FROM {ASSESSMENT_TABLE}
+            WHERE assessment_type = %s AND academic_year = %s AND school_name = %s
+              AND assessment_type COLLATE utf8mb4_bin = %s AND assessment_category COLLATE utf8mb4_bin = %s
+            """,
+            (partition.assessment_type, partition.academic_year, partition.school_name,
+             partition.assessment_type, partition.assessment_category)
+        )
+        row_count, content_hash = cursor.fetchone()
+        return row_count, content_hash or 0
+
+
+def _save_fingerprints(cursor, fingerprints):
+    cursor.executemany(
+        f"""
+        INSERT INTO {FROZEN_PARTITIONS_TABLE} (
+            school_name, academic_year, assessment_type, assessment_category,
+            row_count, content_hash, frozen_at, verified_at
+        ) VALUES (%s, %s, %s, %s, %s, %s, NOW(), NOW())
+        ON DUPLICATE KEY UPDATE
+            row_count = VALUES(row_count), content_hash = VALUES(content_hash), verified_at = VALUES(verified_at)
+        """,
+        [_key(partition) + fingerprint for partition, fingerprint in fingerprints.items()]
+    )
+
+
+def freeze_years(conn, academic_years):
+    """
+    Mark `academic_years` final and fingerprint their partitions as stored
+    now (refreezing a year replaces its fingerprints). Returns
+    {year: (partitions, rows)}.
+    """
+    academic_years = list(academic_years)
+    fingerprints = year_fingerprints(conn, academic_years)
+    summary = {year: (0, 0) for year in academic_years}
+    for partition, (row_count, _) in fingerprints.items():
+        partitions, rows = summary[partition.academic_year]
+        summary[partition.academic_year] = (partitions + 1, rows + row_count)
+    placeholders = ', '.join(['%s'] * len(academic_years))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FROZEN_PARTITIONS_TABLE} WHERE academic_year IN ({placeholders})",
+                           academic_years)
+            if fingerprints:
+                _save_fingerprints(cursor, fingerprints)
+            cursor.executemany(
+                f"""
+                INSERT INTO {FROZEN_YEARS_TABLE} (academic_year, frozen_at) VALUES (%s, NOW())
+                ON DUPLICATE KEY UPDATE frozen_at = VALUES(frozen_at)
+                """,
+                [(year,) for year in academic_years]
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return summary
+
+
+def unfreeze_years(conn, academic_years):
+    """Drop `academic_years` from the registry; returns the years that were frozen."""
+    academic_years = list(academic_years)
+    placeholders = ', '.join(['%s'] * len(academic_years))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT academic_year FROM {FROZEN_YEARS_TABLE} WHERE academic_year IN ({placeholders})",
+                           academic_years)
+            frozen = sorted(row[0] for row in cursor.fetchall())
+            cursor.execute(f"DELETE FROM {FROZEN_PARTITIONS_TABLE} WHERE academic_year IN ({placeholders})",
+                           academic_years)
+            cursor.execute(f"DELETE FROM {FROZEN_YEARS_TABLE} WHERE academic_year IN ({placeholders})",
+                           academic_years)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return frozen
+
+
+class FrozenYears:
+    """
+    Frozen years of a sweep, loaded and verified once, then updated as the
+    partitions it let through finish. Re-fingerprinting (`record`, on a
+    writer thread) updates the drifted set and verification times that
+    `plan` is sorting re-probes by, hence `_lock`.
+    """
+
+    def __init__(self, reprobe_limit=DEFAULT_REPROBE_LIMIT):
+        self.reprobe_limit = reprobe_limit
+        self.years = set()
+        self.entries = {}  # Partition -> [row_count, content_hash, verified_at]
+        self.drifted = set()
+        self.stats = {'skipped': 0, 'drifted': 0, 'reprobed': 0, 'reprobe_changed': 0,
+                      'refingerprinted': 0, 'verify_seconds': 0.0}
+        self._reprobes = set()
+        self._lock = threading.Lock()
+
+    def load(self, conn, academic_years):
+        academic_years = list(academic_years)
+        if not academic_years:
+            return self
+        placeholders = ', '.join(['%s'] * len(academic_years))
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT academic_year FROM {FROZEN_YEARS_TABLE} WHERE academic_year IN ({placeholders})",
+                           academic_years)
+            self.years = {row[0] for row in cursor.fetchall()}
+            if not self.years:
+                return self
+            cursor.execute(
+                f"""
+                SELECT assessment_category, academic_year, school_name, assessment_type,
+                       row_count, content_hash, verified_at
+                FROM {FROZEN_PARTITIONS_TABLE}
+                WHERE academic_year IN ({', '.join(['%s'] * len(self.years))})
+                """,
+                sorted(self.years)
+            )
+            self.entries = {Partition(*row[:4]): list(row[4:]) for row in cursor.fetchall()}
+        return self
+
+    def verify(self, conn):
+        """Compare the registry with the rows stored now; mismatching partitions are reloaded."""
+        if not self.years:
+            return
+        started = time.monotonic()
+        stored = year_fingerprints(conn, self.years)
+        for partition in set(stored) | set(self.entries):
+            entry = self.entries.get(partition)
+            expected = (0, 0) if entry is None else tuple(entry[:2])
+            actual = stored.get(partition, (0, 0))
+            if actual != expected:
+                self.drifted.add(partition)
+                content = 'same' if actual[1] == expected[1] else 'differs'
+                logging.warning(f"Frozen partition drifted: {_describe(partition)} "
+                                f"(rows {expected[0]} → {actual[0]}, content hash {content})")
+        self.stats['verify_seconds'] += time.monotonic() - started
+        logging.info(f"Frozen years {', '.join(sorted(self.years))}: {len(self.entries)} partitions verified "
+                     f"in {self.stats['verify_seconds']:.1f}s, {len(self.drifted)} drifted")
+
+    def plan(self, partitions, on_skip=None):
+        """
+        Yield the partitions worth requesting: every one outside the frozen
+        years and the drifted ones, then up to `reprobe_limit` frozen ones,
+        least recently verified first. The others are passed to `on_skip`.
+        """
+        skipped = []
+        for partition in partitions:
+            if partition.academic_year not in self.years:
+                yield partition
+                continue
+            with self._lock:
+                drifted = partition in self.drifted
+                if drifted:
+                    self.stats['drifted'] += 1
+            if drifted:
+                yield partition
+            else:
+                skipped.append(partition)
+
+        # Re-probe only partitions that had rows; the rest of a frozen year was empty when frozen
+        with self._lock:
+            candidates = sorted((p for p in skipped if p in self.entries), key=lambda p: self.entries[p][2])
+            reprobes = candidates[:self.reprobe_limit]
+            self._reprobes.update(reprobes)
+            self.stats['skipped'] += len(skipped) - len(reprobes)
+            self.stats['reprobed'] += len(reprobes)
+        if on_skip is not None:
+            for partition in skipped:
+                if partition not in self._reprobes:
+                    on_skip(partition)
+        yield from reprobes
+
+    def record(self, conn, partition, outcome):
+        """Re-fingerprint a frozen-year partition that was loaded successfully."""
+        if partition.academic_year not in self.years:
+            return
+        changed = outcome.change_counts['inserted'] + outcome.change_counts['changed']
+        with self._lock:
+            if partition in self._reprobes and changed:
+                self.stats['reprobe_changed'] += 1
+            entry = self.entries.get(partition)
+            drifted = partition in self.drifted
+        if partition in self._reprobes and changed:
+            logging.warning(f"Frozen partition changed at the source: {_describe(partition)} "
+                            f"({changed} rows inserted/updated)")
+        if not drifted and not changed and entry is not None:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    UPDATE {FROZEN_PARTITIONS_TABLE} SET verified_at = NOW()
+                    WHERE school_name = %s AND academic_year = %s AND assessment_type = %s AND assessment_category = %s
+                    """,
+                    _key(partition)
+                )
+            conn.commit()
+            with self._lock:
+                entry[2] = datetime.now()
+            return
+
+        fingerprint = partition_fingerprint(conn, partition)
+        with conn.cursor() as cursor:
+            if fingerprint[0]:
+                _save_fingerprints(cursor, {partition: fingerprint})
+            else:
+                cursor.execute(
+                    f"""
+                    DELETE FROM {FROZEN_PARTITIONS_TABLE}
+                    WHERE school_name = %s AND academic_year = %s AND assessment_type = %s AND assessment_category = %s
+                    """,
+                    _key(partition)
+                )
+        conn.commit()
+        with self._lock:
+            self.entries[partition] = list(fingerprint) + [datetime.now()]
+            self.drifted.discard(partition)
+            self.stats['refingerprinted'] += 1
+
+    def log_summary(self):
+        if not self.years:
+            return
+        s = self.stats
+        logging.info(f"Frozen years: {s['skipped']} partitions skipped, {s['drifted']} drifted and reloaded, "
+                     f"{s['reprobed']} re-probed ({s['reprobe_changed']} changed at the source), "
+                     f"{s['refingerprinted']} re-fingerprinted")
+
+
+def _describe(partition):
+    return (f"{partition.assessment_category} | {partition.academic_year} | "
+            f"{partition.school_name} | {partition.assessment_type}")
+
+
+def _key(partition):
+    return (partition.school_name, partition.academic_year, partition.assessment_type, partition.assessment_category)
+
+
+def frozen_years_from_config(config):
+    """FrozenYears from the optional [frozen_years] section, or None when disabled."""
+    if not config.getboolean('frozen_years', 'enabled', fallback=True):
+        return None
+    return FrozenYears(config.getint('frozen_years', 'reprobe_limit', fallback=DEFAULT_REPROBE_LIMIT))
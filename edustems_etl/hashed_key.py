@@ -0,0 +1,136 @@
+"""Hashed upsert key of student_full_assessment_data (`[etl] key_mode = hashed`).
+
+The readable `assessment_id_generated` is cut to 64 characters and keeps only
+the first two words of the question, so distinct assessments can collide,
+and its unique index is a 191-character utf8mb4 prefix. In hashed mode the
+upsert key is `assessment_key BINARY(16)`: the MD5 of the full, untruncated
+identity fields joined with \\x1f (NULL and NaN as '', like COALESCE):
+
+    student_id, assessment_type, assessment_date, subject_name,
+    competency_level_name, question_name
+
+Each part of the readable key has its full column here, so rows that differ
+only in competency keep separate keys. (The readable key takes its competency
+letters from `competency_name`, which API rows do not carry, so in practice
+it never separated them; the stored `competency_level_name` does.)
+
+MD5 because MySQL computes the identical digest, which lets the migration key
+existing rows in place; it identifies rows, it does not protect anything.
+`assessment_id_generated` stays a normal (unindexed) column.
+
+`migrate_to_hashed_key` is idempotent and resumable: it adds the column,
+fills it in id ranges (one commit per range), then swaps the unique index in
+a single ALTER. Once it has run, the table only works in hashed mode:
+`hashed_key_active` tells a readable-mode run to switch.
+"""
+import hashlib
+import logging
+
+from edustems_etl.schema import HASHED_KEY_COLUMN, ROW_COLUMNS, is_null
+
+IDENTITY_COLUMNS = ['student_id', 'assessment_type', 'assessment_date', 'subject_name', 'competency_level_name',
+                    'question_name']
+HASHED_KEY_INDEX = 'uniq_assessment_key'
+READABLE_KEY_INDEX = 'uniq_assessment_generated'
+MIGRATION_BATCH_ROWS = 50000
+
+_identity_indexes = [ROW_COLUMNS.index(col) for col in IDENTITY_COLUMNS]
+
+# Same digest as identity_key, computed from the stored columns
+IDENTITY_KEY_SQL = "UNHEX(MD5(CONCAT_WS(CHAR(31 USING utf8mb4), {})))".format(', '.join(
+    f"COALESCE(CAST({col} AS CHAR), '')" if col == 'assessment_date' else f"COALESCE({col}, '')"
+    for col in IDENTITY_COLUMNS
+))
+
+
+class KeyMigrationError(Exception):
+    """The table cannot be switched to the hashed key as it stands."""
+
+
+def identity_key(row):
+    """16-byte key of a row ordered like ROW_COLUMNS."""
+    identity = '\x1f'.join('' if is_null(row[i]) else str(row[i]) for i in _identity_indexes)
+    return hashlib.md5(identity.encode('utf-8'), usedforsecurity=False).digest()
+
+
+def _column_exists(cursor, table, column):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """,
+        (table, column)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """,
+        (table, index)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def _fill_keys(conn, cursor, table, batch_rows):
+    cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table} WHERE {HASHED_KEY_COLUMN} IS NULL")
+    low, high = cursor.fetchone()
+    filled = 0
+    if low is None:
+        return filled
+    for start in range(low, high + 1, batch_rows):
+        cursor.execute(
+            f"UPDATE {table} SET {HASHED_KEY_COLUMN} = {IDENTITY_KEY_SQL} "
+            f"WHERE id BETWEEN %s AND %s AND {HASHED_KEY_COLUMN} IS NULL",
+            (start, start + batch_rows - 1)
+        )
+        filled += cursor.rowcount
+        conn.commit()
+        logging.info(f"Hashed key migration: {filled} rows keyed (ids up to {min(high, start + batch_rows - 1)} of {high})")
+    return filled
+
+
+def hashed_key_active(conn, table):
+    """Whether `table` has been migrated to the hashed upsert key."""
+    with conn.cursor() as cursor:
+        return _index_exists(cursor, table, HASHED_KEY_INDEX)
+
+
+def migrate_to_hashed_key(conn, table, batch_rows=MIGRATION_BATCH_ROWS):
+    """
+    Switch `table` to the hashed upsert key; a no-op once done. Returns True
+    if anything was migrated. Raises KeyMigrationError (before touching the
+    indexes) if two stored rows share an identity.
+    """
+    with conn.cursor() as cursor:
+        if _index_exists(cursor, table, HASHED_KEY_INDEX):
+            return False
+        if not _column_exists(cursor, table, HASHED_KEY_COLUMN):
+            logging.info(f"Hashed key migration: adding {HASHED_KEY_COLUMN} to {table}")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {HASHED_KEY_COLUMN} BINARY(16) NULL AFTER assessment_id_generated")
+            conn.commit()
+
+        _fill_keys(conn, cursor, table, batch_rows)
+
+        cursor.execute(
+            f"SELECT COUNT(*) FROM (SELECT {HASHED_KEY_COLUMN} FROM {table} "
+            f"GROUP BY {HASHED_KEY_COLUMN} HAVING COUNT(*) > 1) duplicated"
+        )
+        duplicated = cursor.fetchone()[0]
+        if duplicated:
+            raise KeyMigrationError(f"{duplicated} identities are stored more than once in {table}; "
+                                    f"resolve them before switching to the hashed key")
+
+        # Rows a concurrent readable-mode run inserted meanwhile
+        _fill_keys(conn, cursor, table, batch_rows)
+        changes = [f"MODIFY {HASHED_KEY_COLUMN} BINARY(16) NOT NULL", f"ADD UNIQUE KEY {HASHED_KEY_INDEX} ({HASHED_KEY_COLUMN})"]
+        if _index_exists(cursor, table, READABLE_KEY_INDEX):
+            changes.append(f"DROP INDEX {READABLE_KEY_INDEX}")
+        logging.info(f"Hashed key migration: swapping the unique key of {table}")
+        cursor.execute(f"ALTER TABLE {table} {', '.join(changes)}")
+    conn.commit()
+    logging.info(f"Hashed key migration of {table} complete")
+    return True
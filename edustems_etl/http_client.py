@@ -0,0 +1,178 @@
+"""Shared HTTP client for the edustems API.
+
+One `requests.Session` per process with a pooled adapter, so consecutive and
+concurrent requests reuse keep-alive connections instead of opening a new TLS
+session each. Responses are negotiated with gzip/deflate and downloaded into
+a spooled temp file inside the retry loop: connection errors, timeouts,
+truncated bodies and 429/5xx answers are retried with jittered exponential
+backoff, so a transient failure no longer loses the partition. Every request
+is recorded (status, attempts, bytes, latency) for the end-of-run summary,
+and every attempt is reported to the optional `observer` (the adaptive rate
+controller) as soon as its headers arrive or it fails.
+"""
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from edustems_etl.json_stream import READ_SIZE, SPOOL_MAX_MEMORY, spool_response
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+RequestRecord = namedtuple('RequestRecord', ['url', 'status', 'attempts', 'wire_bytes', 'body_bytes', 'elapsed', 'ok'])
+
+
+class RetryableStatus(requests.exceptions.HTTPError):
+    """A 429/5xx answer, retried like a connection error."""
+
+
+class ApiClient:
+    """
+    Pooled, retrying GET client. Thread-safe: fetch workers share one
+    instance (size `pool_size` to the number of workers).
+
+    `observer(url, status=None, latency=None, error=None)` is called once
+    per attempt, from the fetching thread.
+    """
+
+    def __init__(self, pool_size=4, connect_timeout=10.0, read_timeout=600.0, max_retries=4,
+                 backoff_base=1.0, backoff_max=60.0, verify=False, headers=None, observer=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.observer = observer
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.session = requests.Session()
+        self.session.verify = verify
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        if headers:
+            self.session.headers.update(headers)
+        # Retries are handled in fetch() so they also cover errors while reading the body
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff(self, attempt, response=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(self.backoff_max, float(retry_after)))
+        return delay
+
+    def fetch(self, url, params=None, max_memory=SPOOL_MAX_MEMORY):
+        """
+        GET `url` and return its body as a rewound spooled file.
+
+        Non-retryable HTTP errors (4xx) raise immediately; retryable ones raise
+        the last error once `max_retries` retries are used up.
+        """
+        started = time.monotonic()
+        attempt = 0
+        status = None
+        self._local.last = None
+        while True:
+            try:
+                with self.session.get(url, params=params, timeout=self.timeout, stream=True) as response:
+                    status = response.status_code
+                    if self.observer is not None:
+                        self.observer(url, status=status, latency=response.elapsed.total_seconds())
+                    if status in RETRY_STATUSES:
+                        raise RetryableStatus(f"{status} Server Error for url: {response.url}", response=response)
+                    response.raise_for_status()
+                    body = spool_response(response, max_memory=max_memory, read_size=READ_SIZE)
+                    wire_bytes = _wire_bytes(response)
+            except (RetryableStatus,) + RETRY_ERRORS as e:
+                if self.observer is not None and not isinstance(e, RetryableStatus):
+                    self.observer(url, error=e)
+                if attempt >= self.max_retries:
+                    self._record(url, status, attempt + 1, 0, 0, started, ok=False)
+                    raise
+                delay = self._backoff(attempt, getattr(e, 'response', None))
+                attempt += 1
+                logging.warning(f"Retry {attempt}/{self.max_retries} in {delay:.1f}s for {url}: {e}")
+                time.sleep(delay)
+                continue
+            except requests.exceptions.RequestException:
+                self._record(url, status, attempt + 1, 0, 0, started, ok=False)
+                raise
+
+            body.seek(0, 2)
+            body_bytes = body.tell()
+            body.seek(0)
+            self._record(url, status, attempt + 1, wire_bytes or body_bytes, body_bytes, started)
+            return body
+
+    def _record(self, url, status, attempts, wire_bytes, body_bytes, started, ok=True):
+        record = RequestRecord(url, status, attempts, wire_bytes, body_bytes, time.monotonic() - started, ok)
+        self._local.last = record
+        with self._lock:
+            self.records.append(record)
+
+    def last_record(self):
+        """Record of the latest `fetch` made on the calling thread (None if it made none)."""
+        return getattr(self._local, 'last', None)
+
+    def summary(self):
+        """Totals over every request made so far."""
+        with self._lock:
+            records = list(self.records)
+        latencies = sorted(r.elapsed for r in records)
+        return {
+            'requests': len(records),
+            'retries': sum(r.attempts - 1 for r in records),
+            'failures': sum(1 for r in records if not r.ok),
+            'wire_bytes': sum(r.wire_bytes for r in records),
+            'body_bytes': sum(r.body_bytes for r in records),
+            'latency_mean': sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_p95': latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+            'latency_max': latencies[-1] if latencies else 0.0,
+        }
+
+    def log_summary(self):
+        s = self.summary()
+        logging.info(
+            f"HTTP: {s['requests']} requests, {s['retries']} retries, {s['failures']} failed | "
+            f"{s['wire_bytes'] / 1048576:.1f} MB on the wire, {s['body_bytes'] / 1048576:.1f} MB decoded | "
+            f"latency mean {s['latency_mean']:.2f}s, p95 {s['latency_p95']:.2f}s, max {s['latency_max']:.2f}s"
+        )
+
+    def close(self):
+        self.session.close()
+
+
+def _wire_bytes(response):
+    # Compressed bytes read off the socket, when urllib3 can tell
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return None
+
+
+def client_from_config(config, pool_size=4, headers=None, observer=None):
+    """ApiClient configured from the optional [http] section of a script's config."""
+    return ApiClient(
+        pool_size=pool_size,
+        connect_timeout=config.getfloat('http', 'connect_timeout', fallback=10.0),
+        read_timeout=config.getfloat('http', 'read_timeout', fallback=600.0),
+        max_retries=config.getint('http', 'max_retries', fallback=4),
+        backoff_base=config.getfloat('http', 'backoff_base', fallback=1.0),
+        backoff_max=config.getfloat('http', 'backoff_max', fallback=60.0),
+        headers=headers,
+        observer=observer,
+    )
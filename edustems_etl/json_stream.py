@@ -0,0 +1,188 @@
+"""Incremental decoding of edustems `{"data": [...]}` payloads.
+
+The API wraps every result set in a top-level object whose `data` key holds
+one JSON object per row. Instead of `response.json()` materialising the whole
+body, these helpers yield the rows one at a time (or in fixed-size chunks)
+straight from a byte stream, so memory is bounded by the chunk size rather
+than the response size.
+"""
+import codecs
+import io
+import json
+import re
+import tempfile
+from itertools import islice
+
+try:
+    import ijson
+except ImportError:  # optional C-accelerated parser
+    ijson = None
+
+READ_SIZE = 64 * 1024
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+_number_tail = re.compile(r'[0-9eE.+-]*\Z')
+
+
+class IterableReader(io.RawIOBase):
+    """File-like wrapper over an iterable of byte chunks (e.g. `iter_content`)."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            self._pending = next(self._chunks, None)
+            if self._pending is None:
+                self._pending = b''
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class _TextCursor:
+    """Sliding window over a byte stream, decoded to text on demand."""
+
+    def __init__(self, stream, read_size):
+        self.stream = stream
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        data = self.stream.read(self.read_size)
+        text = self.decoder.decode(data or b'', final=not data)
+        self.eof = not data
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return bool(data) or bool(text)
+
+    def peek(self):
+        while True:
+            self.pos = _whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON payload: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number cut off at the window edge ("12" of "12.5e3") may continue
+            # in the next read, so only trust it once a delimiter is in view.
+            if (not self.eof and isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                    and _number_tail.match(self.buf, end) and self.fill()):
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_array_items(stream, key, read_size):
+    cursor = _TextCursor(stream, read_size)
+    cursor.expect('{')
+    if cursor.peek() == '}':
+        return
+    while True:
+        name = cursor.value()
+        cursor.expect(':')
+        if name == key:
+            if cursor.peek() != '[':
+                cursor.value()
+                return
+            cursor.pos += 1
+            if cursor.peek() == ']':
+                return
+            while True:
+                yield cursor.value()
+                separator = cursor.peek()
+                cursor.pos += 1
+                if separator == ']':
+                    return
+                if separator != ',':
+                    raise ValueError(f"Malformed JSON payload: unexpected {separator!r} in '{key}' array")
+        cursor.value()
+        separator = cursor.peek()
+        cursor.pos += 1
+        if separator == '}':
+            return
+        if separator != ',':
+            raise ValueError(f"Malformed JSON payload: unexpected {separator!r} in top-level object")
+
+
+def iter_json_array(stream, key='data', read_size=READ_SIZE):
+    """
+    Yield the elements of the top-level `key` array of a JSON object.
+
+    `stream` is a binary file-like object or an iterable of byte chunks. A
+    missing or null `key` yields nothing, matching `payload.get(key, [])`.
+    """
+    if not hasattr(stream, 'read'):
+        stream = IterableReader(stream)
+    if ijson is not None:
+        yield from ijson.items(stream, f'{key}.item', use_float=True)
+        return
+    yield from _iter_array_items(stream, key, read_size)
+
+
+def iter_chunks(items, size):
+    """Group an iterator into lists of at most `size` items."""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def spool_response(response, max_memory=SPOOL_MAX_MEMORY, read_size=READ_SIZE):
+    """
+    Drain a `stream=True` response into a spooled temp file and rewind it.
+
+    Bodies up to `max_memory` bytes stay in memory, larger ones roll over to
+    disk, so a fetch worker can finish with the connection without the body
+    ever being held as one Python object.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    try:
+        for block in response.iter_content(chunk_size=read_size):
+            spool.write(block)
+    except Exception:
+        spool.close()
+        raise
+    finally:
+        response.close()
+    spool.seek(0)
+    return spool
+
+
+def stream_digest(stream, digest, read_size=READ_SIZE):
+    """Feed a seekable binary stream to `digest` (a hashlib object), rewind it and return the hex digest."""
+    start = stream.tell()
+    for block in iter(lambda: stream.read(read_size), b''):
+        digest.update(block)
+    stream.seek(start)
+    return digest.hexdigest()
@@ -0,0 +1,173 @@
+"""Parquet landing zone for fetched and cleaned assessment partitions.
+
+Two layers live under the landing root, both laid out as hive partitions:
+
+    raw/academic_year=2024-2025/assessment_category=Standardized/school_name=ABMPS/assessment_type=UNIT%201/part-00000.parquet
+    cleaned/...same keys.../part-00000.parquet
+
+`raw` keeps the API rows as delivered (every field as text, numbers in their
+JSON form, nulls preserved); `cleaned` holds the transformed rows with the
+column types of student_full_assessment_data. Each chunk becomes one file.
+Files of a partition are written to a hidden staging directory (ignored by
+dataset readers) and swapped in when the partition completes, so a re-run
+replaces the partition atomically and a failed partition leaves the previous
+landing untouched.
+
+pyarrow is optional: without it `LandingZone` cannot be created and the
+scripts run without a landing zone.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+from edustems_etl.schema import ROW_COLUMNS
+
+LAYERS = ('raw', 'cleaned')
+COMPRESSION = 'zstd'
+FLOAT_COLUMNS = frozenset({'obtained_marks', 'max_marks', 'percentage'})
+DATE_COLUMNS = frozenset({'assessment_date'})
+
+
+def pyarrow_available():
+    return pa is not None
+
+
+def _raw_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _float(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+def _cleaned_array(column, values):
+    if column in FLOAT_COLUMNS:
+        return pa.array([_float(v) for v in values], type=pa.float64())
+    text = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+    if column in DATE_COLUMNS:
+        return text.cast(pa.date32())
+    return text
+
+
+class LandingZone:
+    """Writes raw and cleaned chunks of each partition under `root`."""
+
+    def __init__(self, root):
+        if pa is None:
+            raise RuntimeError("The Parquet landing zone needs pyarrow (pip install pyarrow).")
+        self.root = root
+        self.stats = {'files': 0, 'rows': 0, 'partitions': 0, 'failed_partitions': 0}
+        self._chunk_counts = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def partition_dir(self, layer, partition):
+        keys = [
+            ('academic_year', partition.academic_year),
+            ('assessment_category', partition.assessment_category),
+            ('school_name', partition.school_name),
+            ('assessment_type', partition.assessment_type),
+        ]
+        return os.path.join(self.root, layer, *(f"{key}={quote(str(value), safe='')}" for key, value in keys))
+
+    def _staging_dir(self, layer, partition):
+        final = self.partition_dir(layer, partition)
+        return os.path.join(os.path.dirname(final), f".{os.path.basename(final)}.tmp-{os.getpid()}")
+
+    def _write(self, layer, partition, table):
+        with self._lock:
+            index = self._chunk_counts.get((layer, partition), 0)
+            self._chunk_counts[(layer, partition)] = index + 1
+        staging = self._staging_dir(layer, partition)
+        os.makedirs(staging, exist_ok=True)
+        pq.write_table(table, os.path.join(staging, f"part-{index:05d}.parquet"), compression=COMPRESSION)
+        with self._lock:
+            self.stats['files'] += 1
+            if layer == 'cleaned':
+                self.stats['rows'] += table.num_rows
+
+    def _guarded(self, layer, partition, build):
+        if partition in self._failed:
+            return
+        try:
+            self._write(layer, partition, build())
+        except Exception as e:
+            logging.warning(f"Landing {layer} chunk of {partition} failed: {e}")
+            with self._lock:
+                self._failed.add(partition)
+
+    def raw_chunk(self, partition, chunk):
+        """Land one chunk of API row dicts as delivered."""
+        def build():
+            columns = list(dict.fromkeys(key for row in chunk for key in row))
+            return pa.table({
+                col: pa.array([_raw_text(row.get(col)) for row in chunk], type=pa.string())
+                for col in columns
+            })
+        self._guarded('raw', partition, build)
+
+    def cleaned_chunk(self, partition, rows):
+        """Land one chunk of `transform_chunk` rows (ordered like ROW_COLUMNS)."""
+        def build():
+            columns = list(zip(*rows)) if rows else [()] * len(ROW_COLUMNS)
+            return pa.table({col: _cleaned_array(col, values) for col, values in zip(ROW_COLUMNS, columns)})
+        self._guarded('cleaned', partition, build)
+
+    def finish(self, partition, ok):
+        """Swap the partition's staged files in (or drop them if it failed)."""
+        with self._lock:
+            failed = partition in self._failed
+            self._failed.discard(partition)
+            for layer in LAYERS:
+                self._chunk_counts.pop((layer, partition), None)
+        ok = ok and not failed
+        for layer in LAYERS:
+            staging, final = self._staging_dir(layer, partition), self.partition_dir(layer, partition)
+            if not ok:
+                shutil.rmtree(staging, ignore_errors=True)
+                continue
+            if not os.path.isdir(staging):
+                # No rows this time: the partition is now empty
+                shutil.rmtree(final, ignore_errors=True)
+                continue
+            previous = None
+            if os.path.isdir(final):
+                previous = os.path.join(os.path.dirname(final), f".{os.path.basename(final)}.old-{os.getpid()}")
+                os.replace(final, previous)
+            os.replace(staging, final)
+            if previous:
+                shutil.rmtree(previous, ignore_errors=True)
+        with self._lock:
+            self.stats['partitions' if ok else 'failed_partitions'] += 1
+
+    def log_summary(self):
+        s = self.stats
+        logging.info(
+            f"Landing zone {self.root}: {s['partitions']} partitions landed "
+            f"({s['files']} files, {s['rows']} cleaned rows), {s['failed_partitions']} discarded"
+        )
+
+
+def landing_from_config(config):
+    """LandingZone from the optional [landing] section, or None when disabled."""
+    if not config.getboolean('landing', 'enabled', fallback=False):
+        return None
+    if pa is None:
+        logging.warning("[landing] is enabled but pyarrow is not installed; running without the Parquet landing zone")
+        return None
+    return LandingZone(config.get('landing', 'directory', fallback='landing'))
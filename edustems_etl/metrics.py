@@ -0,0 +1,258 @@
+"""Structured metrics of one ETL run.
+
+`RunMetrics` collects, per partition, the API request (latency, attempts,
+bytes), rows parsed, rows written (inserted or changed), transform and upsert
+time, the inserted / changed / unchanged / duplicate row counts and the
+rowcount, plus run totals (HTTP, pipeline and writer summaries, peak RSS). At the end of the run it writes
+
+    <directory>/<job>_<YYYYmmdd-HHMMSS>.json   full run summary, one file per run
+    <directory>/<job>.prom                      Prometheus textfile, replaced each run
+
+The textfile is meant for node_exporter's textfile collector; its series
+carry an `etl_job` label (`job` is Prometheus' own). To keep the series
+count bounded it holds run totals and per-school / per-endpoint aggregates;
+the per-partition detail lives in the JSON summary only.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRIC_PREFIX = 'edustems_etl'
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process and of its reaped children (transform workers)."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def _new_partition(partition):
+    return {
+        'assessment_category': partition.assessment_category,
+        'academic_year': partition.academic_year,
+        'school_name': partition.school_name,
+        'assessment_type': partition.assessment_type,
+        'status': 'pending',
+        'endpoint': None,
+        'http_status': None,
+        'request_seconds': None,
+        'attempts': 0,
+        'retries': 0,
+        'response_bytes': 0,
+        'wire_bytes': 0,
+        'rows_parsed': 0,
+        'rows_written': 0,
+        'chunks': 0,
+        'transform_seconds': 0.0,
+        'upsert_seconds': 0.0,
+        'elapsed_seconds': None,
+        'affected': 0,
+        'inserted': 0,
+        'changed': 0,
+        'unchanged': 0,
+        'duplicates': 0,
+        'error': None,
+    }
+
+
+class RunMetrics:
+    """Per-partition and run-level metrics of one run of `job` (thread-safe)."""
+
+    def __init__(self, job, directory='metrics'):
+        self.job = job
+        self.directory = directory
+        self.started_at = datetime.now()
+        self._started = time.monotonic()
+        self.partitions = {}
+        self.run = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, partition):
+        entry = self.partitions.get(partition)
+        if entry is None:
+            entry = self.partitions[partition] = _new_partition(partition)
+        return entry
+
+    def request(self, partition, record):
+        """Note the API request (an ApiClient RequestRecord) made for `partition`."""
+        if record is None:
+            return
+        with self._lock:
+            entry = self._entry(partition)
+            entry.update(
+                endpoint=record.url.rsplit('/', 1)[-1],
+                http_status=record.status,
+                request_seconds=round(record.elapsed, 4),
+                attempts=record.attempts,
+                retries=record.attempts - 1,
+                response_bytes=record.body_bytes,
+                wire_bytes=record.wire_bytes,
+            )
+
+    def partition_done(self, partition, outcome, status=None):
+        """Note a finished partition from its pipeline `PartitionOutcome`."""
+        counts = outcome.change_counts
+        with self._lock:
+            entry = self._entry(partition)
+            entry.update(
+                status=status or ('error' if outcome.error else 'ok' if outcome.rows else 'empty'),
+                rows_parsed=outcome.rows,
+                rows_written=counts['inserted'] + counts['changed'],
+                chunks=outcome.chunks,
+                transform_seconds=round(outcome.transform_seconds, 4),
+                upsert_seconds=round(outcome.write_seconds, 4),
+                elapsed_seconds=round(time.monotonic() - outcome.started, 4),
+                affected=outcome.affected,
+                inserted=counts['inserted'],
+                changed=counts['changed'],
+                unchanged=counts['unchanged'],
+                duplicates=counts['duplicates'],
+                error=str(outcome.error) if outcome.error else None,
+            )
+
+    def partition_skipped(self, partition, reason):
+        with self._lock:
+            self._entry(partition)['status'] = reason
+
+    def finish(self, **sections):
+        """Close the run; keyword sections (e.g. http=..., writer=...) are added to the summary."""
+        with self._lock:
+            entries = list(self.partitions.values())
+        statuses = defaultdict(int)
+        for entry in entries:
+            statuses[entry['status']] += 1
+        self.run = {
+            'job': self.job,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'duration_seconds': round(time.monotonic() - self._started, 3),
+            'partitions': dict(statuses),
+            'peak_rss_bytes': peak_rss_bytes(),
+        }
+        for field in ('rows_parsed', 'rows_written', 'affected', 'inserted', 'changed', 'unchanged',
+                      'duplicates', 'retries', 'response_bytes', 'transform_seconds', 'upsert_seconds'):
+            self.run[field] = round(sum(entry[field] for entry in entries), 4)
+        self.run.update(sections)
+        return self.run
+
+    def summary(self):
+        return {'run': self.run, 'partitions': list(self.partitions.values())}
+
+    # ---------- export ----------
+    def _aggregate(self, key):
+        groups = defaultdict(lambda: defaultdict(float))
+        for entry in self.partitions.values():
+            if entry[key] is None:
+                continue
+            group = groups[entry[key]]
+            group['partitions'] += 1
+            for field in ('request_seconds', 'response_bytes', 'retries', 'rows_parsed',
+                          'rows_written', 'duplicates', 'transform_seconds', 'upsert_seconds'):
+                group[field] += entry[field] or 0
+        return groups
+
+    def prometheus_lines(self):
+        job = _label(self.job)
+        lines = []
+
+        def metric(name, help_text, kind, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join([f'etl_job="{job}"'] + [f'{k}="{_label(v)}"' for k, v in labels])
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {_number(value)}")
+
+        run = self.run
+        metric('run_duration_seconds', 'Wall time of the last run.', 'gauge', [((), run['duration_seconds'])])
+        metric('run_finished_timestamp_seconds', 'When the last run finished.', 'gauge',
+               [((), datetime.fromisoformat(run['finished_at']).timestamp())])
+        metric('run_partitions', 'Partitions of the last run by outcome.', 'gauge',
+               [((('status', status),), count) for status, count in sorted(run['partitions'].items())])
+        metric('run_rows', 'Rows of the last run by stage outcome.', 'gauge', [
+            ((('stage', field),), run[field])
+            for field in ('rows_parsed', 'rows_written', 'inserted', 'changed', 'unchanged', 'duplicates', 'affected')
+        ])
+        metric('run_stage_seconds', 'Busy time of the last run by stage.', 'gauge', [
+            ((('stage', 'transform'),), run['transform_seconds']),
+            ((('stage', 'upsert'),), run['upsert_seconds']),
+        ])
+        metric('run_http_retries', 'HTTP retries in the last run.', 'gauge', [((), run['retries'])])
+        metric('run_response_bytes', 'Decoded response bytes in the last run.', 'gauge', [((), run['response_bytes'])])
+        if run.get('peak_rss_bytes'):
+            metric('run_peak_rss_bytes', 'Peak resident set size of the last run.', 'gauge',
+                   [((('process', process),), value) for process, value in run['peak_rss_bytes'].items()])
+
+        for key, label in (('school_name', 'school'), ('endpoint', 'endpoint')):
+            groups = sorted(self._aggregate(key).items())
+            for field, help_text in (
+                ('partitions', 'Partitions in the last run'),
+                ('request_seconds', 'Summed API request latency in the last run'),
+                ('response_bytes', 'Decoded response bytes in the last run'),
+                ('retries', 'HTTP retries in the last run'),
+                ('rows_parsed', 'Rows parsed in the last run'),
+                ('rows_written', 'Rows written (inserted or changed) in the last run'),
+                ('duplicates', 'Rows dropped as repeated keys, in a batch or across alias partitions, in the last run'),
+                ('transform_seconds', 'Transform time in the last run'),
+                ('upsert_seconds', 'Upsert time in the last run'),
+            ):
+                metric(f"{label}_{field}", f"{help_text}, by {label}.", 'gauge',
+                       [(((label, name),), values[field]) for name, values in groups])
+        return lines
+
+    def write(self):
+        """Write the JSON summary and the Prometheus textfile; returns their paths."""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = self.started_at.strftime('%Y%m%d-%H%M%S')
+        json_path = os.path.join(self.directory, f"{self.job}_{stamp}.json")
+        prom_path = os.path.join(self.directory, f"{self.job}.prom")
+        _atomic_write(json_path, json.dumps(self.summary(), indent=2, default=str))
+        _atomic_write(prom_path, '\n'.join(self.prometheus_lines()) + '\n')
+        return json_path, prom_path
+
+    def write_logged(self):
+        """`write`, logging instead of raising: metrics never fail a run."""
+        try:
+            json_path, prom_path = self.write()
+            logging.info(f"Run metrics written to {json_path} and {prom_path}")
+        except Exception as e:
+            logging.warning(f"Could not write run metrics: {e}")
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value or 0))
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def metrics_from_config(config, job):
+    """RunMetrics for `job` from the optional [metrics] section, or None when disabled."""
+    if not config.getboolean('metrics', 'enabled', fallback=True):
+        return None
+    return RunMetrics(job, config.get('metrics', 'directory', fallback='metrics'))
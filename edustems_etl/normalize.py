@@ -0,0 +1,136 @@
+"""Grade, division and gender normalization for assessment partitions.
+
+A partition carries only a handful of distinct grade/division/gender
+strings, so columns are mapped through their unique values once (factorize
+lookup) and the results broadcast back; categorical columns are mapped
+through their categories and stay categorical. The normalizers themselves sit behind
+a bounded LRU that lives for the whole process, so values already seen in an
+earlier partition are not re-parsed either.
+"""
+from functools import lru_cache
+import re
+
+import numpy as np
+import pandas as pd
+
+NORMALIZER_CACHE_SIZE = 4096
+
+_PRE_PRIMARY_MAP = {
+    'nursery': 'NURSERY',
+    'jr kg': 'JUNIOR KG', 'jrkg': 'JUNIOR KG', 'junior kg': 'JUNIOR KG',
+    'sr kg': 'SENIOR KG', 'srkg': 'SENIOR KG', 'senior kg': 'SENIOR KG',
+    'j.k.g.': 'JUNIOR KG', 's.k.g.': 'SENIOR KG',
+    'lkg': 'JUNIOR KG', 'ukg': 'SENIOR KG'
+}
+_ROMAN_MAP = {'i': 1, 'ii': 2, 'iii': 3, 'iv': 4, 'v': 5,
+              'vi': 6, 'vii': 7, 'viii': 8, 'ix': 9, 'x': 10}
+_FEMALE_VALUES = {'f', 'female', 'femal', 'fem', 'girl', 'girls', 'gril', 'gurl', 'g'}
+_MALE_VALUES = {'m', 'male', 'mal', 'boy', 'boys', 'boi', 'b'}
+
+_roman_grade = re.compile(r"(grade)?\s*(i{1,3}|iv|v|vi{0,3}|ix|x)\b")
+_number_grade = re.compile(r"(grade|grdae|graed)?\s*(\d{1,2})\b")
+_division_suffix = re.compile(r'\b([A-Za-z]{1,3})\b$')
+
+
+@lru_cache(maxsize=NORMALIZER_CACHE_SIZE)
+def clean_gender(gender):
+    if not isinstance(gender, str):
+        return None
+    gender = gender.strip().lower()
+    if gender in _FEMALE_VALUES:
+        return 'F'
+    elif gender in _MALE_VALUES:
+        return 'M'
+    else:
+        return None
+
+
+@lru_cache(maxsize=NORMALIZER_CACHE_SIZE)
+def extract_division_name(division):
+    if not isinstance(division, str):
+        return None
+    match = _division_suffix.search(division.strip())
+    return match.group(1).upper() if match else division.strip().upper()
+
+
+@lru_cache(maxsize=NORMALIZER_CACHE_SIZE)
+def standardize_grade(grade):
+    if not isinstance(grade, str):
+        return None
+    grade = grade.strip().lower()
+    for key, value in _PRE_PRIMARY_MAP.items():
+        if key in grade:
+            return value
+    roman_match = _roman_grade.search(grade)
+    if roman_match:
+        roman = roman_match.group(2).lower()
+        if roman in _ROMAN_MAP:
+            return f"GRADE {_ROMAN_MAP[roman]}"
+    number_match = _number_grade.search(grade)
+    if number_match:
+        return f"GRADE {int(number_match.group(2))}"
+    return grade.upper()
+
+
+def map_distinct(values, func):
+    """
+    `[func(v) for v in values]` evaluated once per distinct value.
+
+    Missing cells (None/NaN) share one slot, mapped through the first missing
+    value found in `values`.
+    """
+    codes, uniques = pd.factorize(values)
+    # Slot -1 holds the mapping of the column's missing value, so code -1 indexes it
+    mapped = np.empty(len(uniques) + 1, dtype=object)
+    for i, value in enumerate(uniques):
+        mapped[i] = func(value)
+    missing = codes == -1
+    if missing.any():
+        mapped[-1] = func(values[missing.argmax()])
+    return mapped[codes]
+
+
+def map_categories(series, func):
+    """
+    Categorical `series` with every category mapped through `func`; categories
+    that map to the same value merge, ones that map to None/NaN become missing.
+    Missing cells stay missing.
+    """
+    categories = series.cat.categories.to_numpy(dtype=object)
+    if not len(categories):
+        return series
+    mapped = np.empty(len(categories), dtype=object)
+    for i, value in enumerate(categories):
+        mapped[i] = func(value)
+    new_codes, uniques = pd.factorize(mapped)
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes == -1, -1, new_codes[codes])
+    return pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=series.index, name=series.name)
+
+
+def normalize_column(series, func):
+    """Drop-in replacement for `series.apply(func)` for value normalizers."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return map_categories(series, func)
+    values = series.to_numpy(dtype=object)
+    try:
+        mapped = map_distinct(values, func)
+    except TypeError:
+        # Unhashable cells cannot be factorized or cached
+        return series.apply(getattr(func, '__wrapped__', func))
+    return pd.Series(mapped, index=series.index, name=series.name, dtype=object)
+
+
+def normalize_partition(df):
+    df['gender'] = normalize_column(df['gender'], clean_gender)
+    df['grade_name'] = normalize_column(df['grade_name'], standardize_grade)
+    df['division_name'] = normalize_column(df['division_name'], extract_division_name)
+    return df
+
+
+def cache_stats():
+    """Hit/miss counters of the shared normalizer caches, for end-of-run logging."""
+    return {
+        func.__name__: func.cache_info()
+        for func in (clean_gender, extract_division_name, standardize_grade)
+    }
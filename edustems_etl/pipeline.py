@@ -0,0 +1,262 @@
+"""Three-stage fetch → transform → write pipeline.
+
+Fetching runs on the scheduler's I/O threads (see `fetch_partitions`). The
+consuming thread decodes each spooled body into chunks and submits them to a
+process pool for the pandas transform, so CPU work is not serialized by the
+GIL. Transformed chunks are handed, in order, to writer threads that each own
+a pooled database connection. All chunks of one partition go to the same
+writer, so a partition is still written in order and its completion callback
+runs only after its last chunk. With a `writer_key`, partitions with equal
+keys share a writer too and are written one after the other in feed order
+(e.g. partitions whose rows can share an upsert key).
+
+Every hand-off is bounded (pending fetches, in-flight transforms, writer
+queues), so a slow stage holds the earlier ones back instead of buffering
+the sweep in memory. If the consuming thread fails or is interrupted,
+pending transforms are cancelled, writers drop their queued work and every
+thread and process is joined before the error propagates.
+
+An optional `landing` zone (see `LandingZone`) receives each raw chunk as it
+is decoded and each cleaned chunk as it is written, and is told when a
+partition finishes so it can publish or discard what it staged.
+"""
+import logging
+import queue
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+from multiprocessing import get_context
+
+from edustems_etl.json_stream import iter_chunks, iter_json_array
+
+
+class PartitionOutcome:
+    """Running totals of one partition, passed to the completion callback."""
+
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.affected = 0
+        self.max_date = None
+        self.error = None
+        self.change_counts = Counter()
+        self.displaced = set()
+        self.transform_seconds = 0.0
+        self.write_seconds = 0.0
+        self.started = time.monotonic()
+
+    def fail(self, error):
+        if self.error is None:
+            self.error = error
+
+
+class _InlineExecutor:
+    """Runs transforms on the calling thread (transform_workers = 0)."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def _timed(transform_fn, partition, chunk):
+    started = time.monotonic()
+    result = transform_fn(partition, chunk)
+    return result, time.monotonic() - started
+
+
+class Pipeline:
+    """
+    `transform_fn(partition, chunk)` must be a picklable module-level function
+    returning (rows, max_date). `write_fn(conn, rows, change_counts, displaced)`
+    writes rows and returns the rowcount; `displaced` collects the other
+    partitions whose stored rows it took over. `on_done(conn, partition,
+    outcome)` is called once per partition, serialized across writers;
+    `conn` is None if no connection could be had, and the outcome then
+    carries that error. `db` hands out connections (`get`/`release`, see
+    ConnectionManager). `writer_key(partition)` (hashable) picks the writer;
+    by default partitions are dealt round-robin.
+    """
+
+    def __init__(self, db, transform_fn, write_fn, on_done, chunk_size=5000,
+                 transform_workers=2, writer_workers=2, queue_size=4, landing=None, writer_key=None):
+        self.db = db
+        self.writer_key = writer_key
+        self.landing = landing
+        self.transform_fn = transform_fn
+        self.write_fn = write_fn
+        self.on_done = on_done
+        self.chunk_size = chunk_size
+        self.transform_workers = max(0, int(transform_workers))
+        self.writer_workers = max(1, int(writer_workers))
+        self.queue_size = max(1, int(queue_size))
+        self.max_in_flight = max(2, self.transform_workers * 2)
+        self.stats = {'partitions': 0, 'chunks': 0, 'transform_seconds': 0.0,
+                      'write_seconds': 0.0, 'blocked_seconds': 0.0}
+        self._done_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._abort = threading.Event()
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(self.writer_workers)]
+
+    def _add_stat(self, name, value):
+        with self._stats_lock:
+            self.stats[name] += value
+
+    # ---------- writer stage ----------
+    def _writer(self, work):
+        conn = None
+        try:
+            while True:
+                item = work.get()
+                if item is None:
+                    return
+                if self._abort.is_set():
+                    continue
+                kind, partition, outcome, rows = item
+                if self.landing is not None:
+                    if kind == 'rows' and outcome.error is None:
+                        self.landing.cleaned_chunk(partition, rows)
+                    elif kind == 'end':
+                        self.landing.finish(partition, outcome.error is None)
+                try:
+                    if conn is None:
+                        conn = self.db.get()
+                    if kind == 'rows':
+                        if outcome.error is None:
+                            started = time.monotonic()
+                            outcome.affected += self.write_fn(conn, rows, outcome.change_counts, outcome.displaced)
+                            elapsed = time.monotonic() - started
+                            outcome.write_seconds += elapsed
+                            self._add_stat('write_seconds', elapsed)
+                    else:
+                        with self._done_lock:
+                            self.on_done(conn, partition, outcome)
+                except Exception as e:
+                    outcome.fail(e)
+                    if kind == 'end':
+                        logging.error(f"Completion of {partition} failed: {e}")
+                        logging.error(traceback.format_exc())
+                        if conn is None:
+                            # No connection for the callback: it still journals and counts the failure
+                            self._done_without_connection(partition, outcome)
+                    # The connection may be the problem; the pool drops it if it is dead
+                    if conn is not None:
+                        self.db.release(conn)
+                        conn = None
+        finally:
+            if conn is not None:
+                self.db.release(conn)
+
+    def _done_without_connection(self, partition, outcome):
+        try:
+            with self._done_lock:
+                self.on_done(None, partition, outcome)
+        except Exception as e:
+            logging.error(f"Completion of {partition} failed: {e}")
+            logging.error(traceback.format_exc())
+
+    def _put(self, work, item):
+        started = time.monotonic()
+        work.put(item)
+        self._add_stat('blocked_seconds', time.monotonic() - started)
+
+    # ---------- transform stage ----------
+    def _hand_off(self, in_flight, keep=None):
+        """
+        Move finished transforms, in submission order, to their writer queues.
+        Blocks until at most `keep` entries remain (`None`: never blocks).
+        """
+        while in_flight:
+            partition, outcome, work, future = in_flight[0]
+            must_wait = keep is not None and len(in_flight) > keep
+            if future is not None and not must_wait and not future.done():
+                return
+            in_flight.popleft()
+            if future is None:
+                self._put(work, ('end', partition, outcome, None))
+                continue
+            try:
+                (rows, max_date), elapsed = future.result()
+            except BrokenExecutor:
+                raise
+            except Exception as e:
+                outcome.fail(e)
+                continue
+            outcome.transform_seconds += elapsed
+            self._add_stat('transform_seconds', elapsed)
+            self._add_stat('chunks', 1)
+            if max_date and (outcome.max_date is None or max_date > outcome.max_date):
+                outcome.max_date = max_date
+            self._put(work, ('rows', partition, outcome, rows))
+
+    def run(self, fetched):
+        """Consume (partition, payload, error) tuples until exhausted."""
+        if self.transform_workers:
+            # spawn: workers must not inherit the fetch/writer threads' locks
+            executor = ProcessPoolExecutor(max_workers=self.transform_workers, mp_context=get_context('spawn'))
+        else:
+            executor = _InlineExecutor()
+        writers = [
+            threading.Thread(target=self._writer, args=(work,), name=f'writer-{i}', daemon=True)
+            for i, work in enumerate(self._queues)
+        ]
+        for thread in writers:
+            thread.start()
+
+        in_flight = deque()
+        try:
+            for index, (partition, payload, error) in enumerate(fetched):
+                outcome = PartitionOutcome()
+                slot = index if self.writer_key is None else hash(self.writer_key(partition))
+                work = self._queues[slot % len(self._queues)]
+                self.stats['partitions'] += 1
+                if error:
+                    outcome.fail(error)
+                else:
+                    try:
+                        with payload:
+                            for chunk in iter_chunks(iter_json_array(payload), self.chunk_size):
+                                outcome.rows += len(chunk)
+                                outcome.chunks += 1
+                                if self.landing is not None:
+                                    self.landing.raw_chunk(partition, chunk)
+                                in_flight.append((partition, outcome, work,
+                                                  executor.submit(_timed, self.transform_fn, partition, chunk)))
+                                self._hand_off(in_flight, keep=self.max_in_flight)
+                    except BrokenExecutor:
+                        raise
+                    except Exception as e:
+                        # Malformed body: the writer skips chunks of a failed partition
+                        outcome.fail(e)
+                in_flight.append((partition, outcome, work, None))
+                self._hand_off(in_flight)
+            self._hand_off(in_flight, keep=0)
+        except BaseException:
+            self._abort.set()
+            for *_, future in in_flight:
+                if future is not None:
+                    future.cancel()
+            raise
+        finally:
+            # Writers keep draining (or discarding, after an abort) until they see the sentinel
+            for work in self._queues:
+                work.put(None)
+            for thread in writers:
+                thread.join()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def log_summary(self):
+        s = self.stats
+        logging.info(
+            f"Pipeline: {s['partitions']} partitions, {s['chunks']} chunks | "
+            f"transform {s['transform_seconds']:.1f}s busy, write {s['write_seconds']:.1f}s busy, "
+            f"feeder blocked on writers {s['blocked_seconds']:.1f}s"
+        )
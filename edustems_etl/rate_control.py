@@ -0,0 +1,169 @@
+"""Adaptive concurrency and request pacing for the edustems API.
+
+`AdaptiveLimiter` is a drop-in for the scheduler's fixed `HostLimiter`: it
+caps in-flight requests per host and spaces out request starts, but both
+follow the server's health (AIMD):
+
+* every request that gets its response headers within `latency_target` adds
+  1/limit to the host's concurrency limit (one more slot per window of
+  healthy requests, up to the ceiling) and shortens the spacing;
+* a 429/5xx answer, a timeout or a connection error halves the limit (down
+  to the floor) and doubles the spacing (starting at `backoff_interval`, up
+  to `max_interval`); a response slower than `latency_target` shrinks the
+  limit by a quarter.
+
+Failures of requests that were already in flight when the limit dropped do
+not cut it again: one decrease per window of `limit` completed requests.
+Every change of the integer limit or of the spacing is logged.
+
+Attempts are reported by `ApiClient` (its `observer`), so retries count too.
+"""
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+DECREASE_FACTOR = 0.5
+SLOW_DECREASE_FACTOR = 0.75
+INTERVAL_RECOVERY = 0.5
+
+
+class _HostState:
+    def __init__(self, limit, interval):
+        self.limit = float(limit)
+        self.interval = float(interval)
+        self.in_flight = 0
+        self.last_start = 0.0
+        self.since_decrease = None  # completions since the last decrease (None: never decreased)
+        self.cond = threading.Condition()
+
+
+class AdaptiveLimiter:
+    """Per-host AIMD limiter; `run` has the same contract as `HostLimiter.run`."""
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=8, min_interval=0.0,
+                 max_interval=30.0, backoff_interval=0.5, latency_target=20.0):
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.initial_limit = min(self.max_limit, max(self.min_limit, int(initial_limit)))
+        self.min_interval = max(0.0, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.backoff_interval = max(self.min_interval, float(backoff_interval))
+        self.latency_target = float(latency_target)
+        self.stats = {'increases': 0, 'decreases': 0, 'congestion_signals': 0, 'slow_responses': 0}
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _HostState(self.initial_limit, self.min_interval)
+            return self._hosts[host]
+
+    def run(self, url, func, *args):
+        state = self._state(urlsplit(url).netloc)
+        with state.cond:
+            while state.in_flight >= int(state.limit):
+                state.cond.wait()
+            state.in_flight += 1
+            now = time.monotonic()
+            start_at = max(now, state.last_start + state.interval)
+            state.last_start = start_at
+        try:
+            if start_at > now:
+                time.sleep(start_at - now)
+            return func(*args)
+        finally:
+            with state.cond:
+                state.in_flight -= 1
+                state.cond.notify_all()
+
+    def observe(self, url, status=None, latency=None, error=None):
+        """
+        Feedback of one request attempt: its HTTP `status` and header
+        `latency`, or the exception it failed with. 4xx answers other than
+        429 say nothing about load and are ignored.
+        """
+        host = urlsplit(url).netloc
+        state = self._state(host)
+        with state.cond:
+            if state.since_decrease is not None:
+                state.since_decrease += 1
+            if status == 429 or (status is not None and status >= 500):
+                self.stats['congestion_signals'] += 1
+                self._decrease(host, state, DECREASE_FACTOR, f"HTTP {status}")
+            elif isinstance(error, requests.exceptions.Timeout):
+                self.stats['congestion_signals'] += 1
+                self._decrease(host, state, DECREASE_FACTOR, "timeout")
+            elif isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+                self.stats['congestion_signals'] += 1
+                self._decrease(host, state, DECREASE_FACTOR, type(error).__name__)
+            elif error is not None or status is None or status >= 400:
+                return
+            elif latency is not None and latency > self.latency_target:
+                self.stats['slow_responses'] += 1
+                self._decrease(host, state, SLOW_DECREASE_FACTOR, f"slow response {latency:.1f}s")
+            else:
+                self._increase(host, state)
+
+    def _increase(self, host, state):
+        old_limit, old_interval = state.limit, state.interval
+        state.limit = min(self.max_limit, state.limit + 1 / state.limit)
+        interval = state.interval * INTERVAL_RECOVERY
+        state.interval = self.min_interval if interval < max(self.min_interval, 0.01) else interval
+        if int(state.limit) != int(old_limit) or (old_interval > state.interval == self.min_interval):
+            self.stats['increases'] += 1
+            self._log(host, old_limit, old_interval, state, "healthy responses")
+            state.cond.notify_all()
+
+    def _decrease(self, host, state, factor, reason):
+        if state.since_decrease is not None and state.since_decrease < int(state.limit):
+            return  # already backed off for this window of requests
+        old_limit, old_interval = state.limit, state.interval
+        state.limit = max(self.min_limit, state.limit * factor)
+        state.interval = min(self.max_interval, max(self.backoff_interval, state.interval * 2))
+        state.since_decrease = 0
+        if int(state.limit) != int(old_limit) or state.interval != old_interval:
+            self.stats['decreases'] += 1
+            self._log(host, old_limit, old_interval, state, reason)
+
+    def _log(self, host, old_limit, old_interval, state, reason):
+        logging.info(f"Rate control {host}: concurrency {int(old_limit)} → {int(state.limit)}, "
+                     f"spacing {old_interval:.2f}s → {state.interval:.2f}s ({reason})")
+
+    def summary(self):
+        with self._lock:
+            hosts = dict(self._hosts)
+        return dict(self.stats, hosts={
+            host: {'concurrency': int(state.limit), 'spacing': round(state.interval, 3)}
+            for host, state in hosts.items()
+        })
+
+    def log_summary(self):
+        s = self.summary()
+        for host, state in s['hosts'].items():
+            logging.info(f"Rate control {host}: ended at concurrency {state['concurrency']} "
+                         f"(floor {self.min_limit}, ceiling {self.max_limit}), spacing {state['spacing']:.2f}s")
+        logging.info(f"Rate control: {s['increases']} increases, {s['decreases']} decreases | "
+                     f"{s['congestion_signals']} 429/5xx/timeouts, {s['slow_responses']} slow responses")
+
+
+def limiter_from_config(config, per_host_limit=4, request_interval=0.0):
+    """
+    AdaptiveLimiter from the optional [rate_control] section, or None when
+    disabled. [etl] per_host_limit / request_interval are the starting
+    concurrency and the minimum spacing.
+    """
+    if not config.getboolean('rate_control', 'enabled', fallback=True):
+        return None
+    return AdaptiveLimiter(
+        initial_limit=per_host_limit,
+        min_limit=config.getint('rate_control', 'min_concurrency', fallback=1),
+        max_limit=config.getint('rate_control', 'max_concurrency', fallback=per_host_limit),
+        min_interval=request_interval,
+        max_interval=config.getfloat('rate_control', 'max_interval', fallback=30.0),
+        backoff_interval=config.getfloat('rate_control', 'backoff_interval', fallback=0.5),
+        latency_target=config.getfloat('rate_control', 'latency_target', fallback=20.0),
+    )
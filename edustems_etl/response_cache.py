@@ -0,0 +1,175 @@
+"""On-disk cache of raw API response bodies.
+
+Each response is stored compressed (zstd when the `zstandard` package is
+installed, gzip otherwise) under a name derived from the endpoint and its
+query parameters, so the same request always maps to the same file. The
+api-key is left out of the key: rotating it must not invalidate the cache.
+
+Entries older than the caller's TTL are treated as misses, and `evict` trims
+the directory back under its size budget, least recently read first. Writes
+go to a temporary file that is renamed into place, so concurrent fetch
+workers never see a partial entry.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:  # optional, better ratio and speed than gzip
+    zstandard = None
+
+EXCLUDED_PARAMS = frozenset({'api-key'})
+COPY_SIZE = 64 * 1024
+
+_EXTENSIONS = ('.json.zst', '.json.gz')
+
+
+def cache_key(url, params):
+    """Stable hex key for an endpoint + query parameters."""
+    identity = {
+        'url': url,
+        'params': sorted((k, str(v)) for k, v in (params or {}).items() if k not in EXCLUDED_PARAMS)
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Compressed response bodies under `directory`, bounded by `max_bytes`."""
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stored_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, key[:2], key + extension)
+
+    def _find(self, key):
+        for extension in _EXTENSIONS:
+            path = self._path(key, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def open(self, url, params, ttl=None):
+        """
+        Readable binary stream of the cached body, or None on a miss.
+
+        Entries written more than `ttl` seconds ago count as misses; `ttl=None`
+        accepts any age (replay).
+        """
+        path = self._find(cache_key(url, params))
+        if path is None:
+            self._count(False)
+            return None
+        try:
+            stat = os.stat(path)
+            if ttl is not None and time.time() - stat.st_mtime > ttl:
+                self._count(False)
+                return None
+            # atime records the last read for eviction; mtime keeps the fetch time
+            os.utime(path, (time.time(), stat.st_mtime))
+            if path.endswith('.zst'):
+                if zstandard is None:
+                    logging.warning(f"Cached entry {path} needs the zstandard package; treating as a miss.")
+                    self._count(False)
+                    return None
+                stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+            else:
+                stream = gzip.open(path, 'rb')
+        except FileNotFoundError:
+            # Evicted by another worker between the lookup and the open
+            self._count(False)
+            return None
+        self._count(True)
+        return stream
+
+    def store(self, url, params, body):
+        """
+        Copy the binary file-like `body` into the cache and rewind it.
+
+        The body is read from its current position; the caller keeps using it
+        afterwards exactly as if it had not been cached.
+        """
+        key = cache_key(url, params)
+        extension = _EXTENSIONS[0] if zstandard is not None else _EXTENSIONS[1]
+        path = self._path(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        start = body.tell()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{key}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                if zstandard is not None:
+                    with zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False) as out:
+                        shutil.copyfileobj(body, out, COPY_SIZE)
+                else:
+                    with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as out:
+                        shutil.copyfileobj(body, out, COPY_SIZE)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            body.seek(start)
+        # An entry in the other format for the same key is now stale
+        for other in _EXTENSIONS:
+            if other != extension and os.path.exists(self._path(key, other)):
+                os.remove(self._path(key, other))
+        with self._lock:
+            self.stored_bytes += os.path.getsize(path)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    try:
+                        yield path, os.stat(path)
+                    except FileNotFoundError:
+                        continue
+
+    def evict(self, ttl=None):
+        """
+        Drop entries older than `ttl` seconds, then the least recently read
+        ones until the cache fits in `max_bytes`. Returns (files, bytes) removed.
+        """
+        now = time.time()
+        removed_files = removed_bytes = 0
+        kept = []
+        for path, stat in self._entries():
+            if ttl is not None and now - stat.st_mtime > ttl:
+                os.remove(path)
+                removed_files += 1
+                removed_bytes += stat.st_size
+            else:
+                kept.append((stat.st_atime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in kept)
+        if self.max_bytes is not None and total > self.max_bytes:
+            for _, size, path in sorted(kept):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+                removed_files += 1
+                removed_bytes += size
+        return removed_files, removed_bytes
@@ -0,0 +1,166 @@
+"""Pre-aggregated dashboard tables over student_full_assessment_data.
+
+Dashboards group question-level rows by the `idx_full_dashboard_filters`
+columns (type, year, subject, school, grade, division). Two rollup tables
+hold those groups ready-made:
+
+    assessment_rollup_scores      per filter combination: rows, students,
+                                  percentage sum/count/average, marks sums,
+                                  present/absent counts
+    assessment_rollup_competency  the same keys plus competency_level_name:
+                                  rows and students per competency level
+
+Sums and counts are stored next to the averages so a dashboard can combine
+groups (e.g. a whole school) without averaging averages. NULL keys are
+stored as ''.
+
+The ETL keeps them current incrementally: a partition whose run inserted or
+changed rows has its slice (category, year, school, type) deleted and
+re-aggregated from the fact table in one transaction, and so do the slices
+its rows were taken from when an upsert moved stored rows between partitions
+(aliased assessment types); untouched slices are never read. `rebuild_rollup_years` recomputes whole academic years (first fill,
+or after manual edits to the fact table). The tables use the fact table's
+collation, so they group exactly like a GROUP BY over it would.
+"""
+import time
+
+from edustems_etl.schema import ASSESSMENT_TABLE
+
+SCORES_TABLE = 'assessment_rollup_scores'
+COMPETENCY_TABLE = 'assessment_rollup_competency'
+
+# Slice (refresh unit) columns first, so a slice is one primary key range
+DIMENSIONS = [
+    'academic_year', 'assessment_type', 'school_name', 'assessment_category',
+    'subject_name', 'grade_name', 'division_name'
+]
+SLICE_COLUMNS = ['academic_year', 'assessment_type', 'school_name', 'assessment_category']
+
+_dimension_ddl = """
+    academic_year VARCHAR(20) NOT NULL,
+    assessment_type VARCHAR(100) NOT NULL,
+    school_name VARCHAR(100) NOT NULL,
+    assessment_category VARCHAR(50) NOT NULL,
+    subject_name VARCHAR(100) NOT NULL,
+    grade_name VARCHAR(50) NOT NULL,
+    division_name VARCHAR(10) NOT NULL,"""
+
+CREATE_SCORES_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {SCORES_TABLE} ({_dimension_ddl}
+    row_count INT NOT NULL,
+    student_count INT NOT NULL,
+    percentage_count INT NOT NULL,
+    percentage_sum DOUBLE,
+    avg_percentage DOUBLE,
+    obtained_marks_sum DOUBLE,
+    max_marks_sum DOUBLE,
+    present_count INT NOT NULL,
+    absent_count INT NOT NULL,
+    refreshed_at DATETIME NOT NULL,
+    PRIMARY KEY ({', '.join(DIMENSIONS)})
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+"""
+
+CREATE_COMPETENCY_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {COMPETENCY_TABLE} ({_dimension_ddl}
+    competency_level_name VARCHAR(191) NOT NULL,
+    row_count INT NOT NULL,
+    student_count INT NOT NULL,
+    refreshed_at DATETIME NOT NULL,
+    PRIMARY KEY ({', '.join(DIMENSIONS)}, competency_level_name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+"""
+
+_keys = ', '.join(DIMENSIONS)
+_key_exprs = ', '.join(f"COALESCE({col}, '')" for col in DIMENSIONS)
+_group_by = ', '.join(str(i) for i in range(1, len(DIMENSIONS) + 1))
+
+_aggregate_scores = f"""
+INSERT INTO {{table}} (
+    {_keys}, row_count, student_count, percentage_count, percentage_sum, avg_percentage,
+    obtained_marks_sum, max_marks_sum, present_count, absent_count, refreshed_at
+)
+SELECT {_key_exprs},
+       COUNT(*), COUNT(DISTINCT student_id), COUNT(percentage), SUM(percentage), AVG(percentage),
+       SUM(obtained_marks), SUM(max_marks),
+       SUM(CASE WHEN present_absent = 'P' THEN 1 ELSE 0 END),
+       SUM(CASE WHEN present_absent = 'A' THEN 1 ELSE 0 END),
+       NOW()
+FROM {{fact_table}}
+WHERE {{where}}
+GROUP BY {_group_by}
+"""
+
+_aggregate_competency = f"""
+INSERT INTO {{table}} ({_keys}, competency_level_name, row_count, student_count, refreshed_at)
+SELECT {_key_exprs}, LEFT(COALESCE(competency_level_name, ''), 191),
+       COUNT(*), COUNT(DISTINCT student_id), NOW()
+FROM {{fact_table}}
+WHERE {{where}}
+GROUP BY {_group_by}, {len(DIMENSIONS) + 1}
+"""
+
+
+def create_rollup_tables(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_SCORES_TABLE)
+        cursor.execute(CREATE_COMPETENCY_TABLE)
+    conn.commit()
+
+
+def _replace(conn, where, params, fact_table=ASSESSMENT_TABLE, prefix=''):
+    """
+    Delete the rows matching `where` from both rollups and re-aggregate them,
+    atomically. `fact_table` and the `prefix` of the rollup tables name
+    scratch copies (the benchmark's rollup check).
+    """
+    try:
+        with conn.cursor() as cursor:
+            for table, aggregate in ((SCORES_TABLE, _aggregate_scores), (COMPETENCY_TABLE, _aggregate_competency)):
+                table = prefix + table
+                cursor.execute(f"DELETE FROM {table} WHERE {where}", params)
+                cursor.execute(aggregate.format(where=where, table=table, fact_table=fact_table), params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+class RollupMaintainer:
+    """Refreshes the rollup slices of partitions a run changed; counts what it did."""
+
+    def __init__(self, fact_table=ASSESSMENT_TABLE, prefix=''):
+        self.fact_table = fact_table
+        self.prefix = prefix
+        self.stats = {'slices': 0, 'failed': 0, 'seconds': 0.0}
+
+    def refresh(self, conn, partition):
+        """Re-aggregate one partition's slice. Raises on database errors (nothing is committed)."""
+        started = time.monotonic()
+        values = [getattr(partition, col) for col in SLICE_COLUMNS]
+        # A slice taken over from stored rows can have NULL keys, grouped as ''
+        where = ' AND '.join(f"{col} = %s" if value else f"COALESCE({col}, '') = %s"
+                             for col, value in zip(SLICE_COLUMNS, values))
+        params = [value or '' for value in values]
+        try:
+            _replace(conn, where, params, self.fact_table, self.prefix)
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        finally:
+            self.stats['seconds'] += time.monotonic() - started
+        self.stats['slices'] += 1
+
+
+def rebuild_rollup_years(conn, academic_years=None, fact_table=ASSESSMENT_TABLE, prefix=''):
+    """
+    Recompute the rollups of whole academic years (default: every year in
+    the fact table); returns the years rebuilt.
+    """
+    if academic_years is None:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT DISTINCT academic_year FROM {fact_table} WHERE academic_year IS NOT NULL")
+            academic_years = sorted(row[0] for row in cursor.fetchall())
+    for academic_year in academic_years:
+        _replace(conn, 'academic_year = %s', [academic_year], fact_table, prefix)
+    return academic_years
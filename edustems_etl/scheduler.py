@@ -0,0 +1,95 @@
+"""Concurrent fetch scheduler for partitioned edustems API sweeps.
+
+The assessment scripts walk school × academic_year × assessment_type
+partitions. Each fetch is network bound, so partitions are fetched on a
+bounded thread pool while results are handed back in the order the
+partitions were submitted, keeping transform/load deterministic.
+"""
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+Partition = namedtuple('Partition', ['assessment_category', 'academic_year', 'school_name', 'assessment_type'])
+
+
+class HostLimiter:
+    """Caps in-flight requests per host and spaces out request starts."""
+
+    def __init__(self, per_host_limit=4, min_interval=0.0):
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.min_interval = max(0.0, float(min_interval))
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._last_start = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+    def _wait_for_slot(self, host):
+        if not self.min_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._last_start.get(host, 0.0) + self.min_interval)
+            self._last_start[host] = start_at
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def run(self, url, func, *args):
+        host = urlsplit(url).netloc
+        semaphore = self._semaphore(host)
+        with semaphore:
+            self._wait_for_slot(host)
+            return func(*args)
+
+
+def fetch_partitions(partitions, fetch_fn, url_fn, max_workers=4, per_host_limit=4,
+                     min_interval=0.0, max_pending=None, limiter=None):
+    """
+    Fetch every partition on a shared pool and yield (partition, result, error)
+    in the same order as `partitions`.
+
+    `fetch_fn(partition)` runs in a worker thread; `url_fn(partition)` tells the
+    limiter which host the partition hits. `limiter` replaces the fixed
+    HostLimiter(per_host_limit, min_interval), e.g. with the adaptive one. At most `max_pending` fetched-but-not
+    -yet-consumed results are held at once, so a slow consumer applies
+    backpressure instead of buffering the whole sweep in memory.
+    """
+    max_workers = max(1, int(max_workers))
+    max_pending = max(max_workers, int(max_pending or max_workers * 2))
+    if limiter is None:
+        limiter = HostLimiter(per_host_limit, min_interval)
+    partitions = iter(partitions)
+    pending = deque()
+
+    def submit_next(executor):
+        partition = next(partitions, None)
+        if partition is None:
+            return False
+        pending.append((partition, executor.submit(limiter.run, url_fn(partition), fetch_fn, partition)))
+        return True
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch') as executor:
+        try:
+            while len(pending) < max_pending and submit_next(executor):
+                pass
+            while pending:
+                partition, future = pending.popleft()
+                try:
+                    result, error = future.result(), None
+                except Exception as e:
+                    result, error = None, e
+                submit_next(executor)
+                yield partition, result, error
+        finally:
+            for _, future in pending:
+                future.cancel()
+            if pending:
+                logging.info(f"Fetch scheduler stopped with {len(pending)} partitions pending.")
@@ -0,0 +1,94 @@
+"""Layout of the student_full_assessment_data table and the ETL's partition-keyed tables.
+
+Kept free of pandas so the CLI, the landing zone and the writers can use the
+column lists without importing the transform stack.
+"""
+
+ASSESSMENT_TABLE = 'student_full_assessment_data'
+
+# Content columns, hashed into row_hash; rows continue with the key and the hash
+CONTENT_COLUMNS = [
+    'student_id', 'student_name', 'gender', 'school_name', 'subject_name',
+    'assessment_type', 'academic_year', 'grade_name', 'course_name',
+    'division_name', 'competency_level_name', 'assessment_category',
+    'assessment_date', 'obtained_marks', 'max_marks', 'percentage',
+    'description', 'question_name', 'present_absent', 'assessment_id'
+]
+ROW_COLUMNS = CONTENT_COLUMNS + ['assessment_id_generated', 'row_hash']
+# Columns of an upsert: transformed rows plus the write timestamps
+WRITE_COLUMNS = ROW_COLUMNS + ['created_at', 'last_updated_at']
+
+
+def is_null(value):
+    """Whether a row value is stored as NULL: None, NaN/NaT and pandas.NA (tested without pandas)."""
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        return True  # pandas.NA has no truth value
+
+
+def create_partition_table(cursor, table, columns):
+    """
+    CREATE TABLE IF NOT EXISTS for an ETL bookkeeping table keyed by
+    partition: the four Partition columns, then `columns` (DDL lines).
+    Binary collation, because 'UNIT 1' and 'Unit 1' are distinct assessment
+    types and must not share a row.
+    """
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        school_name VARCHAR(100) NOT NULL,
+        academic_year VARCHAR(20) NOT NULL,
+        assessment_type VARCHAR(100) NOT NULL,
+        assessment_category VARCHAR(50) NOT NULL,
+        {', '.join(columns)},
+        PRIMARY KEY (school_name, academic_year, assessment_type, assessment_category)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
+    """)
+
+
+# [etl] key_mode = hashed: rows also carry the binary upsert key (see edustems_etl.hashed_key)
+HASHED_KEY_COLUMN = 'assessment_key'
+HASHED_WRITE_COLUMNS = ROW_COLUMNS + [HASHED_KEY_COLUMN, 'created_at', 'last_updated_at']
+
+CREATE_ASSESSMENT_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {ASSESSMENT_TABLE} (
+    id INT(11) NOT NULL AUTO_INCREMENT,
+    student_id VARCHAR(100),
+    student_name VARCHAR(255),
+    gender VARCHAR(1),
+    school_name VARCHAR(100),
+    subject_name VARCHAR(100),
+    assessment_type VARCHAR(100),
+    academic_year VARCHAR(20),
+    grade_name VARCHAR(50),
+    course_name VARCHAR(100),
+    division_name VARCHAR(10),
+    competency_level_name TEXT,
+    assessment_category VARCHAR(50),
+    assessment_date DATE,
+    obtained_marks FLOAT,
+    max_marks FLOAT,
+    percentage FLOAT,
+    description TEXT,
+    question_name TEXT,
+    present_absent VARCHAR(1),
+    assessment_id VARCHAR(255),
+    assessment_id_generated VARCHAR(255),
+    row_hash CHAR(32),
+    created_at DATETIME,
+    last_updated_at DATETIME,
+    PRIMARY KEY (id),
+    UNIQUE KEY uniq_assessment_generated (assessment_id_generated(191)),
+    KEY idx_full_dashboard_filters (
+        assessment_type,
+        academic_year,
+        subject_name,
+        school_name,
+        grade_name,
+        division_name
+    ),
+    KEY idx_full_competency_level (competency_level_name(191))
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+"""
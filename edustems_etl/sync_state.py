@@ -0,0 +1,80 @@
+"""Per-partition watermarks for the incremental assessment sync.
+
+`etl_sync_state` records, for every (school, academic_year, assessment_type,
+category) partition, when it last synced successfully, the latest
+assessment_date seen so far and a fingerprint of the raw API payload. A
+partition whose payload fingerprint matches the stored one has not changed
+since the watermark and can be skipped without transforming or writing it.
+"""
+from collections import namedtuple
+
+from edustems_etl.scheduler import Partition
+from edustems_etl.schema import create_partition_table
+
+SYNC_STATE_TABLE = 'etl_sync_state'
+
+SyncState = namedtuple('SyncState', ['last_success_at', 'max_assessment_date', 'payload_fingerprint', 'rows_seen'])
+
+
+def create_sync_state_table(conn):
+    with conn.cursor() as cursor:
+        create_partition_table(cursor, SYNC_STATE_TABLE, [
+            'last_success_at DATETIME', 'max_assessment_date DATE',
+            'payload_fingerprint CHAR(32)', 'rows_seen INT'
+        ])
+    conn.commit()
+
+
+def load_sync_states(conn, academic_years):
+    """{Partition: SyncState} for every recorded partition of `academic_years`."""
+    academic_years = list(academic_years)
+    if not academic_years:
+        return {}
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT assessment_category, academic_year, school_name, assessment_type,
+                   last_success_at, max_assessment_date, payload_fingerprint, rows_seen
+            FROM {SYNC_STATE_TABLE}
+            WHERE academic_year IN ({', '.join(['%s'] * len(academic_years))})
+            """,
+            academic_years
+        )
+        return {Partition(*row[:4]): SyncState(*row[4:]) for row in cursor.fetchall()}
+
+
+def save_sync_state(conn, partition, max_assessment_date, payload_fingerprint, rows_seen):
+    """Record a successful sync; the date watermark only ever moves forward."""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {SYNC_STATE_TABLE} (
+                school_name, academic_year, assessment_type, assessment_category,
+                last_success_at, max_assessment_date, payload_fingerprint, rows_seen
+            ) VALUES (%s, %s, %s, %s, NOW(), %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                last_success_at = VALUES(last_success_at),
+                max_assessment_date = GREATEST(
+                    COALESCE(max_assessment_date, VALUES(max_assessment_date)),
+                    COALESCE(VALUES(max_assessment_date), max_assessment_date)
+                ),
+                payload_fingerprint = VALUES(payload_fingerprint),
+                rows_seen = VALUES(rows_seen)
+            """,
+            (partition.school_name, partition.academic_year, partition.assessment_type,
+             partition.assessment_category, max_assessment_date, payload_fingerprint, rows_seen)
+        )
+    conn.commit()
+
+
+def touch_sync_state(conn, partition):
+    """Mark an unchanged partition as successfully checked."""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {SYNC_STATE_TABLE} SET last_success_at = NOW()
+            WHERE school_name = %s AND academic_year = %s AND assessment_type = %s AND assessment_category = %s
+            """,
+            (partition.school_name, partition.academic_year, partition.assessment_type, partition.assessment_category)
+        )
+    conn.commit()
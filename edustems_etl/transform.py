@@ -0,0 +1,93 @@
+"""Transform of one chunk of assessment API rows into upsert rows.
+
+`transform_chunk` is a plain module-level function of (partition, rows) so it
+can run in a worker process: it takes the raw `data` dicts of one chunk and
+returns the cleaned rows ready for `student_full_assessment_data`, without
+touching the database.
+
+Low-cardinality text columns (school, subject, grade, division, ...) are
+categoricals from the moment the chunk is framed, so cleaning and
+normalization work on their few categories; rows are emitted as tuples
+straight from the column arrays.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from edustems_etl.assessment_ids import generate_assessment_ids, record_values
+from edustems_etl.change_detection import row_fingerprint
+from edustems_etl.normalize import normalize_partition
+from edustems_etl.schema import CONTENT_COLUMNS
+from edustems_etl.text_cleaning import clean_and_format_text, fill_competency_from_description
+
+_camel_boundary = re.compile(r'(?<!^)(?=[A-Z])')
+
+# A partition holds a handful of distinct values in these
+CATEGORICAL_COLUMNS = [
+    'school_name', 'subject_name', 'grade_name', 'division_name',
+    'gender', 'course_name', 'present_absent'
+]
+
+
+def camel_to_snake_case(name):
+    return _camel_boundary.sub('_', name).lower() if isinstance(name, str) else name
+
+
+def clean_frame(partition, data):
+    """
+    Frame, clean and normalize one chunk of API rows.
+
+    Returns (df, max_assessment_date): df has snake_case columns and ISO
+    assessment dates; the date is the latest valid one (or None).
+    """
+    df = pd.DataFrame(data)
+    df.columns = [camel_to_snake_case(c) for c in df.columns]
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and df[col].dtype == 'object':
+            df[col] = df[col].astype('category')
+    # Constant per partition: one category, all codes 0
+    codes = np.zeros(len(df), dtype=np.int8)
+    for col in ('academic_year', 'assessment_type', 'assessment_category'):
+        df[col] = pd.Categorical.from_codes(codes, categories=[getattr(partition, col)])
+
+    df = clean_and_format_text(df)
+    df = normalize_partition(df)
+
+    if partition.assessment_category.lower() == 'non-standardized':
+        df['competency_level_name'] = fill_competency_from_description(df)
+
+    # robust date parsing
+    df['assessment_date'] = pd.to_datetime(df['assessment_date'], errors='coerce', dayfirst=True)
+    max_date = df['assessment_date'].max()
+    max_date = None if pd.isna(max_date) else max_date.date()
+    df['assessment_date'] = df['assessment_date'].dt.strftime('%Y-%m-%d')
+    return df, max_date
+
+
+def keyed_rows(df):
+    """
+    Rows ordered like ROW_COLUMNS: content, generated upsert key, row hash.
+
+    Tuples zipped from one object array per column, with the values
+    `df.where(pd.notnull(df), None).to_dict('records')` used to give (row
+    hashes stay the same), but without building a dict per row.
+    """
+    # Upsert key for the whole chunk at once
+    keys = generate_assessment_ids(df).to_numpy(dtype=object)
+    columns = []
+    for col in CONTENT_COLUMNS:
+        values = record_values(df, col)
+        columns.append(np.full(len(df), None, dtype=object) if values is None else values)
+    return [content + (key, row_fingerprint(content)) for content, key in zip(zip(*columns), keys)]
+
+
+def transform_chunk(partition, data):
+    """
+    Clean, normalize and key one chunk of API rows.
+
+    Returns (rows, max_assessment_date): rows are tuples ordered like
+    ROW_COLUMNS; the date is the latest valid assessment_date (or None).
+    """
+    df, max_date = clean_frame(partition, data)
+    return keyed_rows(df), max_date